@@ -3,10 +3,15 @@ import redis
 from dash import Dash, dcc, html
 
 import config
+from scheduler import start_scheduler_thread
 
 app = Dash(__name__, use_pages=True, suppress_callback_exceptions=True)
 server = app.server
 
+# Refresh cached data in the background instead of on the request path
+if config.REFRESH_MODE == "thread":
+    start_scheduler_thread()
+
 
 def layout():
     return html.Div(
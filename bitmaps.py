@@ -0,0 +1,45 @@
+import numpy as np
+
+# Exact learner sets over the dense learner codes of the learner id dictionary.
+#
+# Sets are stored as sorted int32 code arrays, which is compact for the small
+# sets of a single day and dimension. Merged sets are packed bitmaps (one bit
+# per learner code), on which unions, differences and counts are cheap.
+
+# Number of set bits of every byte value
+POPCOUNTS = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def build_bitmap(codes, size):
+    """Packed bitmap of `size` bits with the bits of `codes` set."""
+    is_member = np.zeros(size, dtype=bool)
+    is_member[np.asarray(codes, dtype=np.intp)] = True
+    return np.packbits(is_member, bitorder="little")
+
+
+def merge_bitmaps(learner_sets, size):
+    """Bitmap of the union of learner sets, given as code arrays or bitmaps."""
+    code_sets, bitmaps = [], []
+    for learner_set in learner_sets:
+        if learner_set.dtype == np.uint8:
+            bitmaps.append(learner_set)
+        else:
+            code_sets.append(learner_set)
+
+    bitmap = build_bitmap(
+        np.concatenate(code_sets) if code_sets else np.array([], dtype=np.int32),
+        size,
+    )
+    for other_bitmap in bitmaps:
+        bitmap |= other_bitmap
+    return bitmap
+
+
+def subtract_bitmap(bitmap, other_bitmap):
+    """Bitmap of the learners of `bitmap` that are not in `other_bitmap`."""
+    return bitmap & ~other_bitmap
+
+
+def count_bitmap(bitmap):
+    """Number of learners of a bitmap."""
+    return int(POPCOUNTS[bitmap].sum(dtype=np.int64))
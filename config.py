@@ -14,3 +14,52 @@ REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = os.getenv("REDIS_PORT")
 REDIS_USER = os.getenv("REDIS_USER")
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+
+# Extractor used for the learners fact query: "read_sql" (chunked) or "copy" (COPY ... TO STDOUT)
+LEARNERS_DATA_EXTRACTOR = os.getenv("LEARNERS_DATA_EXTRACTOR", "read_sql")
+
+# Partitioning of the learners data cached in Redis: "none" (by month) or "tenant"
+# (by month and tenant, so workers serving one tenant only load its partitions)
+LEARNERS_DATA_SHARDING = os.getenv("LEARNERS_DATA_SHARDING", "none")
+
+# How the master dashboard counts distinct learners: "exact" or "hll" (merged
+# HyperLogLog sketches, for any date range at a small relative error)
+DISTINCT_LEARNERS_MODE = os.getenv("DISTINCT_LEARNERS_MODE", "exact")
+# HyperLogLog sketches have 2**HLL_PRECISION registers, giving a standard error of
+# 1.04 / sqrt(2**HLL_PRECISION) (1.6% at the default of 12)
+HLL_PRECISION = int(os.getenv("HLL_PRECISION", 12))
+
+# Format of the learners data cached in Redis: "arrow", "parquet" or "pickle"
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "arrow")
+# Column compression codec for the arrow/parquet formats: "zstd", "lz4" or "uncompressed"
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zstd")
+
+# Threads computing the metric families of the master dashboard table concurrently
+# (1 computes them one after another in the callback's thread)
+METRICS_WORKERS = int(os.getenv("METRICS_WORKERS", 1))
+
+# Memoized master dashboard results kept per process, in bytes (least recently
+# used results are evicted first)
+RESULT_CACHE_BYTES = int(os.getenv("RESULT_CACHE_BYTES", 64 * 1024 * 1024))
+# Where memoized results live: "local" (per process) or "redis" (also shared by
+# all workers through Redis)
+RESULT_CACHE_MODE = os.getenv("RESULT_CACHE_MODE", "local")
+
+# Seconds a worker may hold the refresh lock before another worker can take over
+REFRESH_LOCK_LEASE_SECONDS = int(os.getenv("REFRESH_LOCK_LEASE_SECONDS", 1800))
+
+# How stale data gets refreshed:
+# - "request": by the first request that finds the data older than an hour
+# - "thread": by a scheduler thread started in every app process
+# - "external": by a separate `python scheduler.py` process
+REFRESH_MODE = os.getenv("REFRESH_MODE", "request")
+# Seconds between scheduled refreshes, plus up to REFRESH_JITTER_SECONDS of random delay
+REFRESH_INTERVAL_SECONDS = int(os.getenv("REFRESH_INTERVAL_SECONDS", 3600))
+REFRESH_JITTER_SECONDS = int(os.getenv("REFRESH_JITTER_SECONDS", 60))
+# First retry delay after a failed refresh, doubled on every consecutive failure
+REFRESH_RETRY_SECONDS = int(os.getenv("REFRESH_RETRY_SECONDS", 60))
+
+# Seconds after which unchanged reference datasets are re-pulled anyway
+REFERENCE_DATA_TTL_SECONDS = int(os.getenv("REFERENCE_DATA_TTL_SECONDS", 6 * 3600))
+# Same for datasets that almost never change (grades, skills, tenants)
+STATIC_DATA_TTL_SECONDS = int(os.getenv("STATIC_DATA_TTL_SECONDS", 24 * 3600))
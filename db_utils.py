@@ -1,15 +1,25 @@
-import gzip
+import io
+import json
 import pickle
+import re
+import resource
+import threading
 import time
 from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
+import psycopg2
 import redis
+from pandas.api.types import union_categoricals
 from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 
 import config
+from result_cache import clear_local_results, get_local_result, store_local_result
+from serializers import deserialize_frame, serialize_frame
+from sketches import build_sketch
 
 # Create the connection string for the database
 connection_string = f"postgresql://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
@@ -36,6 +46,21 @@ redis_client = redis.Redis(
 
 # Key names
 ALL_LEARNER_DATA_KEY = "learners_data_json"
+LEARNERS_DATA_VERSION_KEY = "learners_data_version"
+LEARNERS_DATA_MANIFEST_KEY = "learners_data_manifest"
+LEARNERS_DATA_PARTITION_KEY_PREFIX = "learners_data_partition:"
+LEARNER_DAY_ROLLUP_KEY = "learner_day_rollup"
+LEARNERS_WEEKLY_CUBE_KEY = "learners_weekly_cube"
+LEARNERS_DAILY_SKETCH_KEY = "learners_daily_sketch"
+LEARNERS_DAILY_BITMAPS_KEY = "learners_daily_bitmaps"
+LEARNERS_PROGRESS_KEY = "learners_progress"
+LEARNERS_QSET_PERFORMANCE_KEY = "learners_qset_performance"
+LEARNER_ID_DICTIONARY_KEY = "learner_id_dictionary"
+QUESTION_ID_DICTIONARY_KEY = "question_id_dictionary"
+QUESTION_SET_ID_DICTIONARY_KEY = "question_set_id_dictionary"
+REFRESH_LOCK_KEY = "refresh_lock"
+REFRESH_FENCING_TOKEN_KEY = "refresh_fencing_token"
+REFRESH_STATS_KEY = "refresh_stats"
 LAST_FETCHED_TIME_KEY = "last_fetched_time"
 MAX_TIME_KEY = "max_time"
 MIN_TIME_KEY = "min_time"
@@ -49,27 +74,248 @@ ALL_SKILLS_KEY = "all_skills"
 ALL_TENANTS_KEY = "all_tenants"
 ALL_LOGGED_IN_USERS_KEY = "all_logged_in_users"
 ALL_QUESTION_SEQUENCE_DATA = "all_question_sequence_data"
+REFERENCE_DATA_CHECKSUMS_KEY = "reference_data_checksums"
+REFERENCE_DATA_FETCHED_AT_KEY = "reference_data_fetched_at"
+MEMOIZED_RESULTS_KEY_PREFIX = "memoized_results:"
+
+# Number of rows fetched per round trip while streaming query results
+QUERY_CHUNK_SIZE = 10000
+
+# Columns identifying a learner's attempt at a question; refreshed rows replace
+# the cached row with the same key
+LEARNERS_DATA_KEY_COLUMNS = ["learner_id", "question_set_id", "question_id"]
+
+# Learners data columns precomputed at ingest, filled in for learners data
+# cached before they existed
+LEARNERS_DATA_DERIVED_COLUMNS = ["week_range", "is_last_question"]
+
+# UUID columns of the learners data, cached as int32 codes, along with the Redis
+# key of the dictionary their codes index into
+ID_DICTIONARY_KEYS = {
+    "learner_id": LEARNER_ID_DICTIONARY_KEY,
+    "question_id": QUESTION_ID_DICTIONARY_KEY,
+    "question_set_id": QUESTION_SET_ID_DICTIONARY_KEY,
+}
 
+# Learners data columns `get_learners_columns` filters on, by filter name
+LEARNERS_DATA_FILTER_COLUMNS = {
+    "tenant": "tenant_name",
+    "school": "school",
+    "grade": "grade",
+    "operation": "operation",
+    "purpose": "purpose",
+}
 
-def execute_query_with_retry(query, max_retries=3, delay=1, dtype=None):
-    conn = engine.connect().execution_options(stream_results=True)
+# Dimensions of the learner-day rollup; a learner's rows of one day are rolled up
+# per combination of these values
+LEARNER_DAY_ROLLUP_KEY_COLUMNS = [
+    "learner_id",
+    "date",
+    "tenant_name",
+    "school",
+    "grade",
+    "operation",
+    "qset_grade",
+    "purpose",
+]
+
+# Filter dimensions of the weekly metric cube, besides the week itself
+LEARNERS_WEEKLY_CUBE_DIMENSIONS = ["tenant_name", "school", "grade", "operation"]
+
+# Dimensions of the learners progress; every learner's progress is tracked per
+# combination of these values
+LEARNERS_PROGRESS_KEY_COLUMNS = ["learner_id", "school", "grade", "operation"]
+# Learners data columns the learners progress is built from
+LEARNERS_PROGRESS_DATA_COLUMNS = LEARNERS_PROGRESS_KEY_COLUMNS + [
+    "qset_grade",
+    "purpose",
+    "is_last_question",
+]
+
+# Dimensions of the learners question set performance; the completed question
+# sets of every learner are aggregated per combination of these values
+LEARNERS_QSET_PERFORMANCE_KEY_COLUMNS = [
+    "question_set_id",
+    "qset_uid",
+    "learner_id",
+    "operation",
+    "qset_grade",
+    "sequence",
+    "purpose",
+    "qset_name",
+    "l2_skill",
+    "l3_skill",
+]
+# Learners data columns the learners question set performance is built from
+LEARNERS_QSET_PERFORMANCE_DATA_COLUMNS = LEARNERS_QSET_PERFORMANCE_KEY_COLUMNS + [
+    "repo_name",
+    "l1_skill",
+    "updated_at",
+    "score",
+    "status",
+]
+
+# Datasets derived from the learners data at ingest, cached next to its partitions
+DERIVED_LEARNERS_DATA_KEYS = [
+    LEARNER_DAY_ROLLUP_KEY,
+    LEARNERS_WEEKLY_CUBE_KEY,
+    LEARNERS_DAILY_BITMAPS_KEY,
+    LEARNERS_PROGRESS_KEY,
+    LEARNERS_QSET_PERFORMANCE_KEY,
+] + ([LEARNERS_DAILY_SKETCH_KEY] if config.DISTINCT_LEARNERS_MODE == "hll" else [])
+
+# Seconds between checks while waiting for another worker's refresh
+REFRESH_LOCK_POLL_SECONDS = 1
+
+# Seconds memoized results shared through Redis are kept when no newer data
+# version gets published to replace them
+MEMOIZED_RESULTS_TTL_SECONDS = 24 * 3600
+
+# Lua scripts guarding writes with the refresh lock's fencing token, so a
+# worker whose lease expired cannot overwrite the data of its successor
+FENCED_SET_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2])
+return 1
+"""
+FENCED_HSET_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[2])
+redis.call('HSET', KEYS[2], unpack(ARGV, 2))
+return 1
+"""
+FENCED_INCR_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call('INCR', KEYS[2])
+"""
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RefreshLeaseLost(Exception):
+    """Raised when a refresh no longer holds the lock it was started with."""
+
+
+def get_peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def log_query_stats(rows, started_at):
+    elapsed = max(time.perf_counter() - started_at, 1e-6)
+    print(
+        f"Fetched {rows} rows in {elapsed:.2f}s ({rows / elapsed:.0f} rows/sec), "
+        f"peak RSS: {get_peak_rss_mb():.2f} MB"
+    )
 
+
+def concat_typed_chunks(chunks):
+    """Materialise already typed chunks into a single frame in one pass.
+
+    Categorical columns are combined with `union_categoricals` so they stay
+    categorical instead of falling back to object when chunk categories differ.
+    Their categories are kept sorted, as `astype("category")` creates them.
+    Empty chunks are left out when others have rows, since their columns may
+    not be typed like those of the other chunks.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    chunks = [chunk for chunk in chunks if len(chunk)] or chunks[:1]
+    if len(chunks) == 1:
+        return chunks[0]
+
+    columns = {}
+    for column in chunks[0].columns:
+        parts = [chunk[column] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[column] = pd.Series(
+                union_categoricals(parts, sort_categories=True), name=column
+            )
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def execute_query_with_retry(query, max_retries=3, delay=1, dtype=None):
     for attempt in range(max_retries):
         try:
-            final_df = pd.DataFrame()
-            for chunk_dataframe in pd.read_sql(query, conn, chunksize=10000):
-                print(f"Processing chunk with {len(chunk_dataframe)} rows")
-                print(
-                    f"Memory usage: {chunk_dataframe.memory_usage(index=True, deep=True).sum() / 1024 ** 2:.2f} MB"
-                )
-                final_df = pd.concat([final_df, chunk_dataframe], ignore_index=True)
-            return final_df.astype(dtype=dtype)
+            started_at = time.perf_counter()
+            with engine.connect().execution_options(stream_results=True) as conn:
+                # Collect typed chunks and build the frame once at the end,
+                # so the load stays linear and dtype savings apply while streaming
+                chunks = []
+                for chunk_dataframe in pd.read_sql(
+                    query, conn, chunksize=QUERY_CHUNK_SIZE
+                ):
+                    if dtype:
+                        chunk_dataframe = chunk_dataframe.astype(dtype=dtype)
+                    print(f"Processing chunk with {len(chunk_dataframe)} rows")
+                    print(
+                        f"Memory usage: {chunk_dataframe.memory_usage(index=True, deep=True).sum() / 1024 ** 2:.2f} MB"
+                    )
+                    chunks.append(chunk_dataframe)
+            final_df = concat_typed_chunks(chunks)
+            log_query_stats(len(final_df), started_at)
+            return final_df
         except exc.OperationalError as e:
             if attempt == max_retries - 1:
                 raise e
             time.sleep(delay)
 
 
+def parse_copy_timestamps(column):
+    """Parse ISO timestamps written by COPY, keeping tz-aware values in UTC like read_sql."""
+    sample = column.dropna()
+    is_tz_aware = not sample.empty and bool(
+        re.search(r"[+-]\d{2}(:?\d{2})?$", sample.iloc[0])
+    )
+    return pd.to_datetime(column, format="ISO8601", utc=is_tz_aware)
+
+
+def execute_copy_query_with_retry(
+    query, max_retries=3, delay=1, dtype=None, parse_dates=None
+):
+    """Run a SELECT through COPY ... TO STDOUT and parse the whole result in one vectorised pass."""
+    copy_query = f"COPY ({query}) TO STDOUT WITH (FORMAT CSV, HEADER)"
+
+    for attempt in range(max_retries):
+        try:
+            started_at = time.perf_counter()
+            buffer = io.BytesIO()
+            raw_conn = engine.raw_connection()
+            try:
+                cursor = raw_conn.cursor()
+                cursor.copy_expert(copy_query, buffer)
+                cursor.close()
+            finally:
+                raw_conn.close()
+            print(f"Copied {buffer.tell() / 1024 ** 2:.2f} MB of CSV data")
+
+            buffer.seek(0)
+            # Only unquoted empty fields (COPY's NULL) are treated as missing values
+            final_df = pd.read_csv(
+                buffer, dtype=dtype, keep_default_na=False, na_values=[""]
+            )
+            for column in parse_dates or []:
+                final_df[column] = parse_copy_timestamps(final_df[column])
+            log_query_stats(len(final_df), started_at)
+            return final_df
+        except (exc.OperationalError, psycopg2.OperationalError) as e:
+            if attempt == max_retries - 1:
+                raise e
+            time.sleep(delay)
+
+
 def get_learners_data(last_updated_at=None):
     query = f"""
     SELECT
@@ -130,11 +376,21 @@ def get_learners_data(last_updated_at=None):
 
     if last_updated_at:
         query = query + f" WHERE lpd.updated_at >= '{last_updated_at.isoformat()}'"
-    return execute_query_with_retry(query, dtype=dtype_dict)
 
+    # Bulk COPY extraction avoids psycopg2 materialising every row as a tuple
+    if config.LEARNERS_DATA_EXTRACTOR == "copy":
+        return execute_copy_query_with_retry(
+            query, dtype=dtype_dict, parse_dates=["updated_at"]
+        )
+    learners_data = execute_query_with_retry(query, dtype=dtype_dict)
+    # Without rows the timestamps cannot be inferred, so they are typed like
+    # those of an empty COPY result
+    if learners_data.empty:
+        learners_data["updated_at"] = pd.to_datetime(learners_data["updated_at"])
+    return learners_data
 
-def get_last_question_per_qset_grade():
-    query = """
+
+LAST_QUESTION_PER_QSET_GRADE_QUERY = """
     WITH ranked_question_sets AS (
         SELECT
             identifier,
@@ -163,6 +419,8 @@ def get_last_question_per_qset_grade():
     WHERE rqs.rn = 1 AND rq.rn=1;
     """
 
+
+def get_last_question_per_qset_grade():
     dtype_dict = {
         "operation": "category",
         "qset_grade": "category",
@@ -170,11 +428,12 @@ def get_last_question_per_qset_grade():
         "question_id": "string",
     }
 
-    return execute_query_with_retry(query, dtype=dtype_dict)
+    return execute_query_with_retry(
+        LAST_QUESTION_PER_QSET_GRADE_QUERY, dtype=dtype_dict
+    )
 
 
-def get_all_learners():
-    query = """
+ALL_LEARNERS_QUERY = """
         SELECT 
         DISTINCT lr.identifier, 
         lr.username as user_name, 
@@ -184,13 +443,15 @@ def get_all_learners():
         ON lr.school_id = sc.identifier
     """
 
+
+def get_all_learners():
     dtype_dict = {
         "identifier": "string",
         "user_name": "category",
         "name": "category",
         "school": "category",
     }
-    return execute_query_with_retry(query, dtype=dtype_dict)
+    return execute_query_with_retry(ALL_LEARNERS_QUERY, dtype=dtype_dict)
 
 
 grades_priority = {
@@ -206,21 +467,51 @@ grades_priority = {
     10: "class-ten",
 }
 
+# Order in which learners work through the operations
+operations_priority = {
+    "Addition": 0,
+    "Subtraction": 1,
+    "Multiplication": 2,
+    "Division": 3,
+}
+
+# Grade a learner moves on to once a grade is completed
+next_grade_map = {
+    "class-one": "class-two",
+    "class-two": "class-three",
+    "class-three": "class-four",
+    "class-four": "class-five",
+    "class-five": "class-six",
+}
+
+# Grade learners of a grade are expected to reach
+target_grade_map = {
+    "class-two": "class-one",
+    "class-three": "class-two",
+    "class-four": "class-three",
+    "class-five": "class-four",
+    "class-six": "class-five",
+}
+
+
+GRADES_QUERY = "SELECT identifier, id, cm.name->>'en' AS grade FROM class_master cm"
+
 
 def get_grades():
-    query = "SELECT identifier, id, cm.name->>'en' AS grade FROM class_master cm"
     dtype_dict = {
         "grade": "category",
     }
-    return execute_query_with_retry(query, dtype=dtype_dict)
+    return execute_query_with_retry(GRADES_QUERY, dtype=dtype_dict)
+
+
+SCHOOLS_QUERY = "SELECT name as school_name FROM school"
 
 
 def get_schools():
-    query = "SELECT name as school_name FROM school"
     dtype_dict = {
         "school_name": "category",
     }
-    schools = execute_query_with_retry(query, dtype=dtype_dict)
+    schools = execute_query_with_retry(SCHOOLS_QUERY, dtype=dtype_dict)
     schools = pd.concat(
         [schools, pd.DataFrame({"school_name": ["No School"]})], ignore_index=True
     )
@@ -228,40 +519,48 @@ def get_schools():
     return schools
 
 
+QSET_TYPES_QUERY = "SELECT DISTINCT(purpose) FROM question_set"
+
+
 def get_qset_types():
-    query = "SELECT DISTINCT(purpose) FROM question_set"
     dtype_dict = {
         "purpose": "category",
     }
-    return execute_query_with_retry(query, dtype=dtype_dict)
+    return execute_query_with_retry(QSET_TYPES_QUERY, dtype=dtype_dict)
+
+
+REPOSITORY_NAMES_QUERY = "SELECT identifier, name->>'en' AS repo_name FROM repository"
 
 
 def get_repository_names():
-    query = "SELECT identifier, name->>'en' AS repo_name FROM repository"
     dtype_dict = {
         "repo_name": "category",
     }
-    return execute_query_with_retry(query, dtype=dtype_dict)
+    return execute_query_with_retry(REPOSITORY_NAMES_QUERY, dtype=dtype_dict)
+
+
+SKILLS_QUERY = "SELECT identifier, name->>'en' as skill, type FROM skill_master"
 
 
 def get_skills():
-    query = "SELECT identifier, name->>'en' as skill, type FROM skill_master"
     dtype_dict = {
         "skill": "category",
         "type": "category",
     }
-    return execute_query_with_retry(query, dtype=dtype_dict)
+    return execute_query_with_retry(SKILLS_QUERY, dtype=dtype_dict)
+
+
+TENANTS_QUERY = "SELECT DISTINCT(id), name->>'en' AS tenant_name FROM tenant"
 
 
 def get_tenants():
-    query = "SELECT DISTINCT(id), name->>'en' AS tenant_name FROM tenant"
     dtype_dict = {
         "tenant_name": "category",
     }
-    return execute_query_with_retry(query, dtype=dtype_dict)
+    return execute_query_with_retry(TENANTS_QUERY, dtype=dtype_dict)
 
 
-def get_logged_in_users():
+def get_logged_in_users(last_created_on=None):
     query = """
         SELECT td.id, td.level, td.learner_id, td.created_on, sc.name as school, cm.name->>'en' as grade, tn.name->>'en' as tenant_name
         FROM telemetry_data td
@@ -276,46 +575,571 @@ def get_logged_in_users():
         "grade": "category",
         "tenant_name": "category",
     }
+
+    if last_created_on:
+        query = query + f" AND td.created_on >= '{last_created_on.isoformat()}'"
     return execute_query_with_retry(query, dtype=dtype_dict)
 
 
-def get_question_sequence_data():
-    print("Fetching question_sequence_data")
-    query = f"""
+QUESTION_SEQUENCE_DATA_QUERY = """
     SELECT question_id, question_set_id, sequence FROM question_set_question_mapping
     """
+
+
+def get_question_sequence_data():
+    print("Fetching question_sequence_data")
     dtype_dict = {
         "question_id": "string",
         "question_set_id": "string",
         "sequence": "int16",
     }
-    question_sequence_data = execute_query_with_retry(query, dtype=dtype_dict)
+    question_sequence_data = execute_query_with_retry(
+        QUESTION_SEQUENCE_DATA_QUERY, dtype=dtype_dict
+    )
     return question_sequence_data
 
 
-def get_cached_data(key):
-    last_fetched_time = redis_client.get(LAST_FETCHED_TIME_KEY)
-    cached_data = redis_client.get(key)
+# Learners data decoded by this process, along with the data version it belongs
+# to: the partition manifest, every decoded partition (with the partition
+# version it was decoded from and its lazily built key and filter indexes), and
+# the full frame (None) or whole-tenant frames once they have been assembled.
+# Frames are shared by all callers and must be treated as read-only.
+local_learners_data = {
+    "version": None,
+    "manifest": None,
+    "frames": {},
+    "partitions": {},
+}
+local_learners_data_lock = threading.Lock()
+
+# Datasets derived from the learners data and id dictionaries, decoded by this
+# process once per data version, along with their lazily built filter indexes
+local_derived_data = {}
+
+
+def load_local_learners_data_manifest(data_version):
+    """Partition manifest for `data_version`, read from Redis once per version.
+
+    Must be called with `local_learners_data_lock` held.
+    """
+    if (
+        local_learners_data["manifest"] is None
+        or local_learners_data["version"] != data_version
+    ):
+        local_learners_data["manifest"] = get_learners_data_manifest()
+        local_learners_data["version"] = data_version
+        local_learners_data["frames"] = {}
+    return local_learners_data["manifest"]
+
+
+def load_local_learners_data_partitions(partition_names, columns=None):
+    """Decoded partitions by name, downloading only what changed since their last decode.
+
+    Partitions are stored column by column, so only those of `columns` (all
+    columns by default) that were not decoded yet for the partition's current
+    version are downloaded. The returned frames may hold more columns.
+
+    Must be called with `local_learners_data_lock` held.
+    """
+    manifest = local_learners_data["manifest"]
+    partitions = local_learners_data["partitions"]
+    missing_columns = {}
+    for partition_name in partition_names:
+        partition = partitions.get(partition_name)
+        if (
+            partition is None
+            or partition["version"] != manifest[partition_name]["version"]
+        ):
+            partition = partitions[partition_name] = {
+                "version": manifest[partition_name]["version"],
+                "frame": None,
+                "key_index": None,
+                "filter_index": {},
+            }
+
+        partition_columns = manifest[partition_name].get("columns")
+        if partition_columns is None:
+            # Partitions cached as a single blob are decoded whole
+            if partition["frame"] is None:
+                missing_columns[partition_name] = None
+            continue
+        missing = [
+            column
+            for column in columns or partition_columns
+            if partition["frame"] is None or column not in partition["frame"]
+        ]
+        if missing:
+            missing_columns[partition_name] = missing
+
+    if missing_columns:
+        print(
+            f"Decoding {len(missing_columns)} of {len(manifest)} "
+            f"{ALL_LEARNER_DATA_KEY} partitions for data version {local_learners_data['version']}"
+        )
+        pipeline = redis_client.pipeline(transaction=False)
+        for partition_name, missing in missing_columns.items():
+            partition_key = get_learners_data_partition_key(partition_name)
+            if missing is None:
+                pipeline.get(partition_key)
+            else:
+                pipeline.hmget(partition_key, missing)
+
+        for (partition_name, missing), blobs in zip(
+            missing_columns.items(), pipeline.execute()
+        ):
+            frame = partitions[partition_name]["frame"]
+            if missing is None:
+                frame = deserialize_frame(blobs)
+                # Partitions cached before the week was precomputed at ingest
+                if "week_range" not in frame:
+                    frame["week_range"] = get_week_ranges(frame["updated_at"])
+            else:
+                column_frames = [deserialize_frame(blob) for blob in blobs]
+                if frame is not None:
+                    # Decoded columns may be a view of an assembled frame
+                    column_frames = [
+                        column_frame.set_axis(frame.index)
+                        for column_frame in column_frames
+                    ]
+                frame = pd.concat(
+                    ([frame] if frame is not None else []) + column_frames,
+                    axis=1,
+                    copy=False,
+                )
+            partitions[partition_name]["frame"] = frame
+
+    # Forget partitions that are no longer listed in the manifest
+    for partition_name in set(partitions) - set(manifest):
+        del partitions[partition_name]
+
+    return {
+        partition_name: partitions[partition_name]["frame"]
+        for partition_name in partition_names
+    }
+
+
+def get_learners_data_columns(manifest):
+    """Columns of the learners data partitions listed in a manifest.
+
+    Empty for partitions cached as a single blob, which are always decoded
+    with all their columns.
+    """
+    return next(
+        (
+            partition["columns"]
+            for partition in manifest.values()
+            if "columns" in partition
+        ),
+        [],
+    )
+
+
+def get_local_learners_data(
+    data_version, columns=None, from_date=None, to_date=None, tenant=None, filters=None
+):
+    """Return the learners frame from the process-local cache.
+
+    With `from_date` and/or `to_date` only the month partitions overlapping
+    that range are loaded, so the result may contain rows outside the range
+    and callers still need to filter on `updated_at`. With a `tenant` only
+    that tenant's rows are returned, loaded from its own shards when the data
+    is sharded by tenant. With `filters` (see `select_filtered_positions`)
+    only the matching rows are gathered from the partitions, looked up in
+    their filter indexes. Only the requested columns of partitions are
+    downloaded and decoded, and only again when `fetch_all_data` has
+    rewritten them since the last decode.
+    """
+    # Dropdowns pass an empty value when no tenant is selected
+    tenant = tenant or None
+    filters = dict(filters or {})
+    with local_learners_data_lock:
+        manifest = load_local_learners_data_manifest(data_version)
+        if not manifest:
+            # Nothing was cached, so not even the columns are known
+            return pd.DataFrame(columns=columns)
+        partition_names = select_learners_data_partitions(
+            manifest, from_date, to_date, tenant
+        )
+        is_sharded = all(
+            is_sharded_learners_data_partition(manifest[partition_name])
+            for partition_name in partition_names
+        )
+        # The tenant's shards only hold its rows, other partitions are filtered
+        tenant_column = LEARNERS_DATA_FILTER_COLUMNS["tenant"]
+        if tenant and is_sharded:
+            filters.pop(tenant_column, None)
+        elif tenant:
+            filters[tenant_column] = tenant
+        if filters and partition_names:
+            return get_local_learners_data_rows(partition_names, columns, filters)
+
+        # Frames of all the data or of a whole tenant are kept for reuse
+        frame_key = tenant if is_sharded else None
+        is_reused = not from_date and not to_date
+
+        learners_data = (
+            local_learners_data["frames"].get(frame_key) if is_reused else None
+        )
+        if learners_data is not None and not set(
+            columns or get_learners_data_columns(manifest)
+        ).issubset(learners_data.columns):
+            learners_data = None
+
+        if learners_data is None and not partition_names:
+            # Nothing overlaps, so return an empty frame with the usual columns
+            partitions = load_local_learners_data_partitions(
+                sorted(manifest)[:1], columns
+            )
+            learners_data = next(iter(partitions.values())).iloc[:0]
+        elif learners_data is None:
+            partitions = load_local_learners_data_partitions(partition_names, columns)
+            # Partitions may have different columns decoded, so only the
+            # columns they all have are assembled
+            frames = list(partitions.values())
+            common_columns = [
+                column
+                for column in get_learners_data_columns(manifest) or frames[0].columns
+                if all(column in frame for frame in frames)
+            ]
+            learners_data = concat_typed_chunks(
+                [frame[common_columns] for frame in frames]
+            )
+
+            if is_reused:
+                local_learners_data["frames"][frame_key] = learners_data
+                # Keep the partitions as views of the assembled frame instead of
+                # copies, unless they have more columns decoded
+                start = 0
+                for partition_name, partition in partitions.items():
+                    stop = start + len(partition)
+                    if len(partition.columns) == len(common_columns):
+                        local_learners_data["partitions"][partition_name]["frame"] = (
+                            learners_data.iloc[start:stop]
+                        )
+                    start = stop
+
+    if tenant and not is_sharded:
+        learners_data = learners_data[learners_data["tenant_name"] == tenant]
+    return learners_data[columns] if columns else learners_data
+
+
+def get_local_learners_data_rows(partition_names, columns, filters):
+    """Rows of the given partitions matching all filters, with only `columns`.
+
+    Must be called with `local_learners_data_lock` held.
+    """
+    manifest = local_learners_data["manifest"]
+    columns = columns or get_learners_data_columns(manifest) or None
+    partitions = load_local_learners_data_partitions(
+        partition_names,
+        list(dict.fromkeys(columns + list(filters))) if columns else None,
+    )
+    return concat_typed_chunks(
+        [
+            get_filtered_rows(
+                partition,
+                local_learners_data["partitions"][partition_name]["filter_index"],
+                filters,
+                columns,
+            )
+            for partition_name, partition in partitions.items()
+        ]
+    ).reset_index(drop=True)
+
+
+def get_local_learners_data_partitions(data_version):
+    """All decoded learners data partitions with their key indexes, by name."""
+    with local_learners_data_lock:
+        manifest = load_local_learners_data_manifest(data_version)
+        load_local_learners_data_partitions(list(manifest))
+        partitions = local_learners_data["partitions"]
+        for partition in partitions.values():
+            if partition["key_index"] is None:
+                partition["key_index"] = build_learners_data_key_index(
+                    partition["frame"]
+                )
+        return {
+            partition_name: (partition["frame"], partition["key_index"])
+            for partition_name, partition in partitions.items()
+        }
+
+
+def get_local_derived_data(key, data_version, columns=None, filters=None):
+    """Return a dataset derived from the learners data from the process-local cache.
+
+    With `filters` (see `select_filtered_positions`) only the matching rows
+    are returned, looked up in the dataset's filter index.
+    """
+    with local_learners_data_lock:
+        derived_data = local_derived_data.get(key)
+        if derived_data is None or derived_data["version"] != data_version:
+            print(f"Decoding {key} for data version {data_version}")
+            derived_data = local_derived_data[key] = {
+                "version": data_version,
+                "frame": deserialize_frame(redis_client.get(key)),
+                "filter_index": {},
+            }
+        frame = derived_data["frame"]
+        if filters:
+            return get_filtered_rows(
+                frame, derived_data["filter_index"], filters, columns
+            )
+
+    return frame[columns] if columns else frame
+
+
+def publish_learners_data_version(
+    manifest, partitions, fencing_token=None, derived_data=None
+):
+    """Announce new learners data to the process-local caches of all workers.
+
+    The partitions and derived datasets that were just stored are kept as this
+    process' local copies, so the refreshing worker does not download its own
+    upload again.
+    """
+    if fencing_token is None:
+        data_version = redis_client.incr(LEARNERS_DATA_VERSION_KEY)
+    else:
+        data_version = redis_client.register_script(FENCED_INCR_SCRIPT)(
+            keys=[REFRESH_LOCK_KEY, LEARNERS_DATA_VERSION_KEY], args=[fencing_token]
+        )
+        if not data_version:
+            raise RefreshLeaseLost(
+                f"Refresh lock lost before publishing (fencing token {fencing_token})"
+            )
+    data_version = str(data_version).encode("utf-8")
+    with local_learners_data_lock:
+        local_learners_data["version"] = data_version
+        local_learners_data["manifest"] = manifest
+        local_learners_data["frames"] = {}
+        for partition_name, partition in partitions.items():
+            local_learners_data["partitions"][partition_name] = {
+                "version": manifest[partition_name]["version"],
+                "frame": partition,
+                "key_index": None,
+                "filter_index": {},
+            }
+        for key, frame in (derived_data or {}).items():
+            local_derived_data[key] = {
+                "version": data_version,
+                "frame": frame,
+                "filter_index": {},
+            }
+
+    # Results memoized for the previous data version are stale now
+    clear_local_results()
+    redis_client.delete(get_memoized_results_key(int(data_version) - 1))
+    return data_version
+
+
+def get_memoized_results_key(data_version):
+    return f"{MEMOIZED_RESULTS_KEY_PREFIX}{int(data_version)}"
+
+
+def get_memoized_result(name, params, compute_result):
+    """Result of `compute_result()`, memoized for the current learners data version.
+
+    Results are memoized by `name` and `params` in a byte-bounded LRU of this
+    process (see `result_cache`). In the "redis" `RESULT_CACHE_MODE` they are
+    also shared with all workers through a Redis hash per data version.
+    Publishing a new data version invalidates all memoized results. Reference
+    datasets, such as the logged in users, change without a new data version,
+    so their checksums are part of the memoized key as well.
+    """
+    pipeline = redis_client.pipeline(transaction=False)
+    pipeline.get(LEARNERS_DATA_VERSION_KEY)
+    pipeline.hgetall(REFERENCE_DATA_CHECKSUMS_KEY)
+    data_version, reference_data_checksums = pipeline.execute()
+    if data_version is None:
+        # Nothing is cached yet, so there is nothing to memoize for
+        return compute_result()
+
+    key = json.dumps(
+        [
+            name,
+            *params,
+            {
+                dataset.decode("utf-8"): checksum.decode("utf-8")
+                for dataset, checksum in reference_data_checksums.items()
+            },
+        ],
+        default=str,
+        sort_keys=True,
+    )
+    blob = get_local_result(data_version, key)
+    if blob is None and config.RESULT_CACHE_MODE == "redis":
+        blob = redis_client.hget(get_memoized_results_key(data_version), key)
+        if blob is not None:
+            store_local_result(data_version, key, blob)
+    if blob is not None:
+        return pickle.loads(blob)
+
+    result = compute_result()
+    blob = pickle.dumps(result)
+    store_local_result(data_version, key, blob)
+    if config.RESULT_CACHE_MODE == "redis":
+        results_key = get_memoized_results_key(data_version)
+        pipeline = redis_client.pipeline()
+        pipeline.hset(results_key, key, blob)
+        pipeline.expire(results_key, MEMOIZED_RESULTS_TTL_SECONDS)
+        pipeline.execute()
+    return result
+
+
+def increment_refresh_stat(stat):
+    redis_client.hincrby(REFRESH_STATS_KEY, stat, 1)
+
+
+def get_refresh_stats():
+    """Counters of refreshes run, skipped and waited for, shared by all workers."""
+    return {
+        stat.decode("utf-8"): int(count)
+        for stat, count in redis_client.hgetall(REFRESH_STATS_KEY).items()
+    }
+
 
-    if (not cached_data) or (not last_fetched_time):
-        fetch_all_data()
-    elif last_fetched_time:
+def acquire_refresh_lock():
+    """Try to take the refresh lock, returning its fencing token if acquired."""
+    fencing_token = redis_client.incr(REFRESH_FENCING_TOKEN_KEY)
+    if redis_client.set(
+        REFRESH_LOCK_KEY,
+        fencing_token,
+        nx=True,
+        ex=config.REFRESH_LOCK_LEASE_SECONDS,
+    ):
+        return fencing_token
+    return None
+
+
+def release_refresh_lock(fencing_token):
+    redis_client.register_script(RELEASE_LOCK_SCRIPT)(
+        keys=[REFRESH_LOCK_KEY], args=[fencing_token]
+    )
+
+
+def refresh_data(wait_for_key=None):
+    """Run `fetch_all_data` in a single worker at a time.
+
+    Workers that find the refresh lock taken skip the refresh and keep serving
+    the cached data. When `wait_for_key` has not been cached yet there is
+    nothing to serve, so they wait for the lock holder to finish instead.
+    """
+    fencing_token = acquire_refresh_lock()
+
+    if fencing_token is None:
+        if not wait_for_key:
+            increment_refresh_stat("skipped_refreshes")
+            print("Refresh already running in another worker. Returning cached data.")
+            return False
+
+        increment_refresh_stat("lock_waits")
+        print(f"Waiting for another worker to cache {wait_for_key}")
+        wait_deadline = time.monotonic() + config.REFRESH_LOCK_LEASE_SECONDS
+        while (
+            redis_client.exists(REFRESH_LOCK_KEY) and time.monotonic() < wait_deadline
+        ):
+            time.sleep(REFRESH_LOCK_POLL_SECONDS)
+
+        # The other refresh failed or its lease expired, so try again ourselves
+        if not redis_client.exists(wait_for_key):
+            return refresh_data(wait_for_key)
+        return False
+
+    try:
+        increment_refresh_stat("refreshes")
+        started_at = time.perf_counter()
+        rows_ingested = fetch_all_data(fencing_token)
+        redis_client.hset(
+            REFRESH_STATS_KEY,
+            mapping={
+                "last_run_at": int(time.time()),
+                "last_run_duration_ms": int((time.perf_counter() - started_at) * 1000),
+                "last_rows_ingested": rows_ingested,
+            },
+        )
+        return True
+    except RefreshLeaseLost as e:
+        increment_refresh_stat("lost_leases")
+        print(f"Discarding refresh results: {e}")
+        return False
+    except Exception:
+        increment_refresh_stat("failures")
+        raise
+    finally:
+        release_refresh_lock(fencing_token)
+
+
+def get_cached_data(
+    key, columns=None, from_date=None, to_date=None, tenant=None, filters=None
+):
+    # Only a few bytes are fetched here; the learners data is checked through
+    # its partition manifest instead of downloading the partitions
+    last_fetched_time, data_version = redis_client.mget(
+        LAST_FETCHED_TIME_KEY, LEARNERS_DATA_VERSION_KEY
+    )
+    cache_key = LEARNERS_DATA_MANIFEST_KEY if key == ALL_LEARNER_DATA_KEY else key
+    is_cached = redis_client.exists(cache_key)
+
+    if (not is_cached) or (not last_fetched_time):
+        refresh_data(wait_for_key=cache_key if not is_cached else None)
+        data_version = redis_client.get(LEARNERS_DATA_VERSION_KEY)
+    elif last_fetched_time and config.REFRESH_MODE == "request":
+        # Outside the "request" refresh mode stale data is refreshed by the
+        # scheduler, so request handlers never block on a refresh
         last_fetched_time = datetime.fromisoformat(last_fetched_time.decode("utf-8"))
         # If last fetched time is less than 1 hour, return cached data
         if (datetime.now() - last_fetched_time) > timedelta(hours=1):
-            fetch_all_data()
+            refresh_data()
+            data_version = redis_client.get(LEARNERS_DATA_VERSION_KEY)
 
     # Return the data for the requested key
+    if key in DERIVED_LEARNERS_DATA_KEYS or key in ID_DICTIONARY_KEYS.values():
+        return get_local_derived_data(key, data_version, columns, filters)
     if key == ALL_LEARNER_DATA_KEY:
-        return pickle.loads(gzip.decompress(redis_client.get(key)))
+        return get_local_learners_data(
+            data_version, columns, from_date, to_date, tenant, filters
+        )
     elif key in [LAST_FETCHED_TIME_KEY, MAX_TIME_KEY, MIN_TIME_KEY]:
         return redis_client.get(key)
     return pickle.loads(redis_client.get(key))
 
 
-def store_in_redis(key, data):
-    """Serialize and store data in Redis."""
-    redis_client.set(key, data)
+def store_hash_in_redis(key, fields, fencing_token=None):
+    """Replace a Redis hash with the given fields, fenced like `store_in_redis`."""
+    if fencing_token is None:
+        pipeline = redis_client.pipeline()
+        pipeline.delete(key)
+        pipeline.hset(key, mapping=fields)
+        pipeline.execute()
+        return
+
+    is_stored = redis_client.register_script(FENCED_HSET_SCRIPT)(
+        keys=[REFRESH_LOCK_KEY, key],
+        args=[fencing_token] + [item for field in fields.items() for item in field],
+    )
+    if not is_stored:
+        raise RefreshLeaseLost(
+            f"Refresh lock lost before storing {key} (fencing token {fencing_token})"
+        )
+
+
+def store_in_redis(key, data, fencing_token=None):
+    """Serialize and store data in Redis.
+
+    With a fencing token the value is only written while that token still
+    holds the refresh lock.
+    """
+    if fencing_token is None:
+        redis_client.set(key, data)
+        return
+
+    is_stored = redis_client.register_script(FENCED_SET_SCRIPT)(
+        keys=[REFRESH_LOCK_KEY, key], args=[fencing_token, data]
+    )
+    if not is_stored:
+        raise RefreshLeaseLost(
+            f"Refresh lock lost before storing {key} (fencing token {fencing_token})"
+        )
 
 
 def map_and_merge(df, ref_data, left_key, right_key, new_column):
@@ -330,23 +1154,163 @@ def map_and_merge(df, ref_data, left_key, right_key, new_column):
     return df
 
 
-def update_cache():
-    """Fetch and update static datasets in Redis."""
-    cache_data = {
-        LAST_QUESTION_PER_QSET_GRADE_KEY: get_last_question_per_qset_grade(),
-        ALL_LEARNERS_KEY: get_all_learners(),
-        ALL_GRADES_KEY: get_grades(),
-        ALL_SCHOOLS_KEY: get_schools(),
-        ALL_QSET_TYPES_KEY: get_qset_types(),
-        ALL_REPOSITORY_NAMES_KEY: get_repository_names(),
-        ALL_SKILLS_KEY: get_skills(),
-        ALL_TENANTS_KEY: get_tenants(),
-        ALL_LOGGED_IN_USERS_KEY: get_logged_in_users(),
-        ALL_QUESTION_SEQUENCE_DATA: get_question_sequence_data(),
+def get_week_starts(dates):
+    """Monday of the week of every date, as datetime64[D] values."""
+    dates = pd.Series(dates)
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        dates = dates.dt.tz_localize(None)
+    days = pd.to_datetime(dates).to_numpy(dtype="datetime64[D]")
+
+    # 1970-01-01 was a Thursday, i.e. 3 days after a Monday
+    return days - (days.astype("int64") + 3) % 7
+
+
+def get_week_ranges(dates):
+    """Monday to Sunday week of every date as a "YYYY-MM-DD,YYYY-MM-DD" label.
+
+    Week starts are computed with datetime64 arithmetic and every distinct week
+    is formatted once, so the labels come back as a categorical in week order.
+    Timezone-aware timestamps are bucketed by their local date.
+    """
+    dates = pd.Series(dates)
+    codes, unique_week_starts = pd.factorize(get_week_starts(dates), sort=True)
+    week_ranges = np.char.add(
+        np.char.add(np.datetime_as_string(unique_week_starts, unit="D"), ","),
+        np.datetime_as_string(unique_week_starts + np.timedelta64(6, "D"), unit="D"),
+    )
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=week_ranges),
+        index=dates.index,
+        name="week_range",
+    )
+
+
+def get_reference_data_checksum(query):
+    """Row count and checksum of a query's result, computed inside the database."""
+    checksum_query = f"""
+    SELECT
+        COUNT(*) AS row_count,
+        md5(string_agg(md5(q::text), '' ORDER BY md5(q::text))) AS checksum
+    FROM ({query.strip().rstrip(";")}) q
+    """
+    checksum = execute_query_with_retry(checksum_query)
+    return f"{checksum.loc[0, 'row_count']}:{checksum.loc[0, 'checksum']}"
+
+
+def update_reference_data_cache(key, get_dataset, query, ttl, fencing_token=None):
+    """Re-pull a reference dataset only if it changed or its TTL has expired.
+
+    Returns whether the dataset was re-pulled.
+    """
+    checksum = get_reference_data_checksum(query)
+    cached_checksum = redis_client.hget(REFERENCE_DATA_CHECKSUMS_KEY, key)
+    fetched_at = float(redis_client.hget(REFERENCE_DATA_FETCHED_AT_KEY, key) or 0)
+
+    if (
+        cached_checksum
+        and cached_checksum.decode("utf-8") == checksum
+        and time.time() - fetched_at < ttl
+        and redis_client.exists(key)
+    ):
+        print(f"No changes in {key}. Keeping cached data.")
+        return False
+
+    store_in_redis(key, pickle.dumps(get_dataset()), fencing_token)
+    redis_client.hset(REFERENCE_DATA_CHECKSUMS_KEY, key, checksum)
+    redis_client.hset(REFERENCE_DATA_FETCHED_AT_KEY, key, time.time())
+    return True
+
+
+def update_logged_in_users_cache(fencing_token=None):
+    """Append logins newer than the cached ones, like the learners data refresh."""
+    if redis_client.exists(ALL_LOGGED_IN_USERS_KEY):
+        logged_in_users = pickle.loads(redis_client.get(ALL_LOGGED_IN_USERS_KEY))
+        last_created_on = pd.to_datetime(logged_in_users["created_on"]).max()
+        new_logged_in_users = get_logged_in_users(
+            last_created_on if pd.notna(last_created_on) else None
+        )
+
+        if new_logged_in_users.empty:
+            print(f"No new updates for {ALL_LOGGED_IN_USERS_KEY}")
+            return
+
+        # Logins at the watermark itself are fetched again, so drop them by id
+        logged_in_users = (
+            concat_typed_chunks([logged_in_users, new_logged_in_users])
+            .drop_duplicates(subset=["id"], keep="last")
+            .reset_index(drop=True)
+        )
+    else:
+        logged_in_users = get_logged_in_users()
+
+    store_in_redis(
+        ALL_LOGGED_IN_USERS_KEY, pickle.dumps(logged_in_users), fencing_token
+    )
+    # Logins are only ever appended, so their count and latest time identify
+    # them for the memoized results (see `get_memoized_result`)
+    last_created_on = pd.to_datetime(logged_in_users["created_on"]).max()
+    redis_client.hset(
+        REFERENCE_DATA_CHECKSUMS_KEY,
+        ALL_LOGGED_IN_USERS_KEY,
+        f"{len(logged_in_users)}:{last_created_on}",
+    )
+
+
+def update_cache(fencing_token=None):
+    """Fetch and update static datasets in Redis, re-pulling only the changed ones.
+
+    Returns the keys of the reference datasets that were re-pulled.
+    """
+    # Reference datasets with the query used to detect changes and the TTL
+    # (in seconds) after which they are re-pulled even without changes
+    reference_datasets = {
+        LAST_QUESTION_PER_QSET_GRADE_KEY: (
+            get_last_question_per_qset_grade,
+            LAST_QUESTION_PER_QSET_GRADE_QUERY,
+            config.REFERENCE_DATA_TTL_SECONDS,
+        ),
+        ALL_LEARNERS_KEY: (
+            get_all_learners,
+            ALL_LEARNERS_QUERY,
+            config.REFERENCE_DATA_TTL_SECONDS,
+        ),
+        ALL_GRADES_KEY: (get_grades, GRADES_QUERY, config.STATIC_DATA_TTL_SECONDS),
+        ALL_SCHOOLS_KEY: (
+            get_schools,
+            SCHOOLS_QUERY,
+            config.REFERENCE_DATA_TTL_SECONDS,
+        ),
+        ALL_QSET_TYPES_KEY: (
+            get_qset_types,
+            QSET_TYPES_QUERY,
+            config.REFERENCE_DATA_TTL_SECONDS,
+        ),
+        ALL_REPOSITORY_NAMES_KEY: (
+            get_repository_names,
+            REPOSITORY_NAMES_QUERY,
+            config.REFERENCE_DATA_TTL_SECONDS,
+        ),
+        ALL_SKILLS_KEY: (get_skills, SKILLS_QUERY, config.STATIC_DATA_TTL_SECONDS),
+        ALL_TENANTS_KEY: (
+            get_tenants,
+            TENANTS_QUERY,
+            config.STATIC_DATA_TTL_SECONDS,
+        ),
+        ALL_QUESTION_SEQUENCE_DATA: (
+            get_question_sequence_data,
+            QUESTION_SEQUENCE_DATA_QUERY,
+            config.REFERENCE_DATA_TTL_SECONDS,
+        ),
     }
 
-    for key, data in cache_data.items():
-        store_in_redis(key, pickle.dumps(data))
+    updated_keys = [
+        key
+        for key, (get_dataset, query, ttl) in reference_datasets.items()
+        if update_reference_data_cache(key, get_dataset, query, ttl, fencing_token)
+    ]
+
+    update_logged_in_users_cache(fencing_token)
+    return updated_keys
 
 
 def process_learners_data(updated_data):
@@ -402,65 +1366,1285 @@ def process_learners_data(updated_data):
         updated_data["school"].cat.add_categories("No School").fillna("No School")
     )
 
+    # Week of every record, precomputed for the weekly metrics
+    updated_data["week_range"] = get_week_ranges(updated_data["updated_at"])
+
+    # Whether every record answers the last question of its question set grade,
+    # precomputed for the learners progress
+    updated_data["is_last_question"] = flag_last_questions(
+        updated_data, pickle.loads(redis_client.get(LAST_QUESTION_PER_QSET_GRADE_KEY))
+    )
+
     return updated_data
 
 
-def fetch_all_data():
-    update_cache()
+def flag_last_questions(learners_data, last_questions):
+    """Whether every learners data row answers one of `last_questions`.
+
+    The ids of `last_questions` must be encoded like those of `learners_data`.
+    """
+    keys = ["operation", "qset_grade", "question_set_id", "question_id"]
+    merged_data = learners_data[keys].merge(
+        last_questions[keys].drop_duplicates(), how="left", indicator=True
+    )
+    return (merged_data["_merge"] == "both").to_numpy()
+
 
-    if redis_client.get(ALL_LEARNER_DATA_KEY):
-        learner_data = pickle.loads(
-            gzip.decompress(redis_client.get(ALL_LEARNER_DATA_KEY))
+def get_encoded_last_questions():
+    """Cached last questions per question set grade, with their ids encoded."""
+    last_questions = pickle.loads(redis_client.get(LAST_QUESTION_PER_QSET_GRADE_KEY))
+    for column in ["question_set_id", "question_id"]:
+        last_questions[column] = encode_ids(
+            get_id_dictionary(column), last_questions[column]
         )
-        max_updated_at = pd.to_datetime(learner_data["updated_at"]).max()
-        updated_data = get_learners_data(max_updated_at)
+    # Ids that were never ingested cannot match any learners data row
+    return last_questions[
+        (last_questions["question_set_id"] != -1)
+        & (last_questions["question_id"] != -1)
+    ]
 
-        if not updated_data.empty:
-            updated_data = process_learners_data(updated_data)
-            all_learners_data = (
-                pd.concat([learner_data, updated_data])
-                .drop_duplicates()
-                .reset_index(drop=True)
+
+def fill_missing_learners_data_columns(learners_data):
+    """Add the `LEARNERS_DATA_DERIVED_COLUMNS` missing from cached learners data.
+
+    Learners data cached before these columns were precomputed at ingest
+    lacks them. Its ids must be encoded already.
+    """
+    if "week_range" not in learners_data:
+        learners_data = learners_data.assign(
+            week_range=get_week_ranges(learners_data["updated_at"])
+        )
+    if "is_last_question" not in learners_data:
+        learners_data = learners_data.assign(
+            is_last_question=flag_last_questions(
+                learners_data, get_encoded_last_questions()
+            )
+        )
+    return learners_data
+
+
+def update_learners_data_last_questions(partitions, fencing_token=None):
+    """Recompute `is_last_question` of the cached partitions.
+
+    Needed when the last questions per question set grade were re-pulled and
+    for partitions cached before the column existed. Only partitions whose
+    flags changed are stored again. Returns the data version to read.
+    """
+    last_questions = get_encoded_last_questions()
+
+    changed_partitions = {}
+    for partition_name, (partition, _) in partitions.items():
+        is_last_question = flag_last_questions(partition, last_questions)
+        if "is_last_question" in partition and np.array_equal(
+            partition["is_last_question"].to_numpy(), is_last_question
+        ):
+            continue
+        changed_partitions[partition_name] = partition.assign(
+            is_last_question=is_last_question
+        )
+
+    if not changed_partitions:
+        return redis_client.get(LEARNERS_DATA_VERSION_KEY)
+    print(f"Updating the last questions of {len(changed_partitions)} partitions")
+    manifest = store_learners_data_partitions(changed_partitions, fencing_token)
+
+    # The progress of every learner may depend on the changed flags
+    learners_progress = build_learners_progress(
+        concat_typed_chunks(
+            [
+                changed_partitions.get(partition_name, partition)[
+                    LEARNERS_PROGRESS_DATA_COLUMNS
+                ]
+                for partition_name, (partition, _) in partitions.items()
+            ]
+        )
+    )
+    store_in_redis(
+        LEARNERS_PROGRESS_KEY, serialize_frame(learners_progress), fencing_token
+    )
+    return publish_learners_data_version(
+        manifest,
+        changed_partitions,
+        fencing_token,
+        {LEARNERS_PROGRESS_KEY: learners_progress},
+    )
+
+
+def get_learners_data_partition_key(partition_name):
+    return f"{LEARNERS_DATA_PARTITION_KEY_PREFIX}{partition_name}"
+
+
+def get_month_number(date):
+    """Month of a date as a sortable number, e.g. 202405 for May 2024."""
+    date = pd.Timestamp(date)
+    return date.year * 100 + date.month
+
+
+def split_learners_data_into_partitions(learners_data):
+    """Split learners data into partitions by the month of `updated_at`.
+
+    Partitions are named after their month, e.g. "2024-05". With tenant
+    sharding every tenant gets its own partitions, e.g. "2024-05:Tenant A".
+    Rows without an `updated_at` go to the "0000-00" partition, and so does
+    empty learners data, so that its columns are still listed in the manifest.
+    """
+    if learners_data.empty:
+        partition_name = (
+            "0000-00:" if config.LEARNERS_DATA_SHARDING == "tenant" else "0000-00"
+        )
+        return {partition_name: learners_data.reset_index(drop=True)}
+
+    updated_at = learners_data["updated_at"]
+    months = (updated_at.dt.year * 100 + updated_at.dt.month).fillna(0).astype(int)
+    if config.LEARNERS_DATA_SHARDING != "tenant":
+        return {
+            f"{month // 100:04d}-{month % 100:02d}": partition.reset_index(drop=True)
+            for month, partition in learners_data.groupby(months, sort=True)
+        }
+
+    tenants = learners_data["tenant_name"].astype(object).fillna("")
+    return {
+        f"{month // 100:04d}-{month % 100:02d}:{tenant}": partition.reset_index(
+            drop=True
+        )
+        for (month, tenant), partition in learners_data.groupby(
+            [months, tenants], sort=True
+        )
+    }
+
+
+def is_sharded_learners_data_partition(partition):
+    """Whether a manifest entry belongs to a single tenant."""
+    return "tenant" in partition
+
+
+def is_current_learners_data_partition(partition):
+    """Whether a manifest entry was cached with the current sharding and layout."""
+    return (
+        is_sharded_learners_data_partition(partition)
+        == (config.LEARNERS_DATA_SHARDING == "tenant")
+        and partition.get("id_codes", False)
+        and "columns" in partition
+        and set(LEARNERS_DATA_DERIVED_COLUMNS).issubset(partition["columns"])
+    )
+
+
+def select_learners_data_partitions(
+    manifest, from_date=None, to_date=None, tenant=None
+):
+    """Names of the partitions in the manifest overlapping a date range, in month order.
+
+    With a `tenant` only that tenant's shards are selected. Partitions that are
+    not sharded hold every tenant and are always selected.
+    """
+    from_month = get_month_number(from_date) if from_date else None
+    to_month = get_month_number(to_date) if to_date else None
+    return [
+        partition_name
+        for partition_name, partition in sorted(manifest.items())
+        if (from_month is None or partition["month"] >= from_month)
+        and (to_month is None or partition["month"] <= to_month)
+        and (
+            tenant is None
+            or not is_sharded_learners_data_partition(partition)
+            or partition["tenant"] == tenant
+        )
+    ]
+
+
+def get_learners_data_manifest():
+    manifest = redis_client.get(LEARNERS_DATA_MANIFEST_KEY)
+    return json.loads(manifest) if manifest else {}
+
+
+def store_learners_data_partitions(partitions, fencing_token=None, replace=False):
+    """Store rewritten partitions in Redis and list them in the manifest.
+
+    Every partition is stored as a hash with a serialized frame per column,
+    so readers only download the columns they need. Partitions that are not
+    given are left untouched, unless `replace` is set and they are removed
+    instead. Returns the new manifest.
+    """
+    previous_manifest = get_learners_data_manifest()
+    manifest = {} if replace else dict(previous_manifest)
+
+    for partition_name, partition in partitions.items():
+        store_hash_in_redis(
+            get_learners_data_partition_key(partition_name),
+            {
+                column: serialize_frame(partition[[column]])
+                for column in partition.columns
+            },
+            fencing_token,
+        )
+        # Versions keep counting up across replacements, so workers never
+        # mistake a rewritten partition for the one they decoded before
+        manifest[partition_name] = {
+            "month": int(partition_name[:4] + partition_name[5:7]),
+            "version": previous_manifest.get(partition_name, {}).get("version", 0) + 1,
+            "rows": len(partition),
+            "id_codes": True,
+            "columns": list(partition.columns),
+        }
+        _, is_sharded, tenant = partition_name.partition(":")
+        if is_sharded:
+            manifest[partition_name]["tenant"] = tenant
+
+    store_in_redis(LEARNERS_DATA_MANIFEST_KEY, json.dumps(manifest), fencing_token)
+    removed_partition_names = set(previous_manifest) - set(manifest)
+    if removed_partition_names:
+        redis_client.delete(
+            *[get_learners_data_partition_key(name) for name in removed_partition_names]
+        )
+    print(
+        f"Stored {len(partitions)} of {len(manifest)} {ALL_LEARNER_DATA_KEY} partitions"
+    )
+    return manifest
+
+
+def store_all_learners_data_partitions(learners_data, fencing_token=None):
+    """Replace all cached learners data partitions and publish them."""
+    learners_data, id_dictionaries = encode_learners_data_ids(
+        learners_data, fencing_token
+    )
+    learners_data = fill_missing_learners_data_columns(learners_data)
+    partitions = split_learners_data_into_partitions(learners_data)
+    manifest = store_learners_data_partitions(partitions, fencing_token, replace=True)
+    derived_data = build_derived_learners_data(partitions)
+    store_derived_learners_data(derived_data, fencing_token)
+    publish_learners_data_version(
+        manifest, partitions, fencing_token, {**derived_data, **id_dictionaries}
+    )
+
+
+def get_learner_days(learners_data):
+    """Day of every row's `updated_at`, as a timezone-naive midnight timestamp."""
+    updated_at = learners_data["updated_at"]
+    if isinstance(updated_at.dtype, pd.DatetimeTZDtype):
+        updated_at = updated_at.dt.tz_localize(None)
+    return updated_at.dt.normalize()
+
+
+def hash_learner_days(learner_ids, dates):
+    """64-bit hash of every (learner, day) pair."""
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({"learner_id": learner_ids, "date": dates}), index=False
+    ).to_numpy()
+
+
+def build_learner_day_rollup(learners_data):
+    """Roll question-level learners data up to learner-days.
+
+    One row per learner, day and dimension values, holding the first and last
+    `updated_at`, the number of questions, the score sum and the time spent
+    (last minus first `updated_at`, capped at 45 minutes like the dashboards).
+    """
+    # Scores are summed as int32, since the int8 column would overflow
+    rollup = (
+        learners_data.assign(
+            date=get_learner_days(learners_data),
+            score=learners_data["score"].astype("int32"),
+        )
+        .groupby(LEARNER_DAY_ROLLUP_KEY_COLUMNS, observed=True, dropna=False)
+        .agg(
+            first_updated_at=("updated_at", "min"),
+            last_updated_at=("updated_at", "max"),
+            questions=("updated_at", "size"),
+            score_sum=("score", "sum"),
+        )
+        .reset_index()
+    )
+    rollup["time_spent"] = (
+        (rollup["last_updated_at"] - rollup["first_updated_at"])
+        .dt.total_seconds()
+        .clip(upper=2700)
+    )
+    return rollup
+
+
+def update_learner_day_rollup(rollup, partitions, touched_data):
+    """Roll up again only the learner-days of the rows in `touched_data`.
+
+    A learner-day never spans partitions of different months, so only the
+    partitions of the touched months are scanned for its rows.
+    """
+    touched_dates = get_learner_days(touched_data)
+    touched_learner_days = np.unique(
+        hash_learner_days(touched_data["learner_id"], touched_dates)
+    )
+    touched_months = set(touched_dates.dt.strftime("%Y-%m").fillna("0000-00"))
+
+    chunks = [
+        rollup[
+            ~np.isin(
+                hash_learner_days(rollup["learner_id"], rollup["date"]),
+                touched_learner_days,
             )
+        ]
+    ]
+    for partition_name, partition in partitions.items():
+        if partition_name[:7] not in touched_months:
+            continue
+        is_touched = np.isin(
+            hash_learner_days(partition["learner_id"], get_learner_days(partition)),
+            touched_learner_days,
+        )
+        chunks.append(build_learner_day_rollup(partition[is_touched]))
+
+    print(f"Rolled up {len(touched_learner_days)} touched learner-days")
+    return concat_typed_chunks(chunks).reset_index(drop=True)
+
+
+def hash_learner_ids(learner_ids):
+    """64-bit hash of every learner id, used as the members of learner sets."""
+    return pd.util.hash_pandas_object(pd.Series(learner_ids), index=False).to_numpy()
+
+
+def split_learner_sets(group_ids, learners):
+    """Sorted unique learners (hashes or codes) of every group, in group id order."""
+    order = np.lexsort((learners, group_ids))
+    group_ids, learners = group_ids[order], learners[order]
+    is_distinct = np.ones(len(order), dtype=bool)
+    is_distinct[1:] = (group_ids[1:] != group_ids[:-1]) | (
+        learners[1:] != learners[:-1]
+    )
+    group_ids, learners = group_ids[is_distinct], learners[is_distinct]
+    if not len(group_ids):
+        return []
+    return np.split(learners, np.flatnonzero(np.diff(group_ids)) + 1)
+
+
+def build_learners_weekly_cube(rollup):
+    """Additive weekly aggregates of the learner-day rollup per filter dimension.
+
+    One row per week and combination of `LEARNERS_WEEKLY_CUBE_DIMENSIONS`,
+    holding the question count, score sum and learner-day count. These add up
+    across rows, so any filter combination and range of whole weeks is
+    answered by rolling up the cube. Distinct learners are not additive and
+    are counted from the daily learner bitmaps instead.
+    """
+    cube_keys = ["week_start"] + LEARNERS_WEEKLY_CUBE_DIMENSIONS
+    return (
+        rollup.assign(
+            week_start=get_week_starts(rollup["date"]).astype("datetime64[ns]")
+        )
+        .groupby(cube_keys, observed=True, dropna=False)
+        .agg(
+            questions=("questions", "sum"),
+            score_sum=("score_sum", "sum"),
+            learner_days=("learner_id", "size"),
+        )
+        .reset_index()
+    )
+
+
+def update_learners_weekly_cube(cube, rollup, touched_data):
+    """Rebuild only the cube rows of the weeks with touched rows."""
+    # Compared with isin, so rows without a date are matched as well
+    touched_weeks = pd.unique(
+        get_week_starts(get_learner_days(touched_data)).astype("datetime64[ns]")
+    )
+    rollup_weeks = pd.Series(
+        get_week_starts(rollup["date"]).astype("datetime64[ns]"), index=rollup.index
+    )
+    return concat_typed_chunks(
+        [
+            cube[~cube["week_start"].isin(touched_weeks)],
+            build_learners_weekly_cube(rollup[rollup_weeks.isin(touched_weeks)]),
+        ]
+    ).reset_index(drop=True)
+
+
+def build_learners_daily_sketch(rollup):
+    """Distinct learner sketches per day and filter dimension of the rollup.
+
+    One row per day and combination of `LEARNERS_WEEKLY_CUBE_DIMENSIONS`
+    with a mergeable sketch of its learners (see `sketches`): the sorted
+    learner hashes while there are few of them, HyperLogLog registers
+    otherwise. Only one of the `learners` and `registers` columns is set.
+    """
+    sketch_keys = ["date"] + LEARNERS_WEEKLY_CUBE_DIMENSIONS
+    grouped_rollup = rollup.groupby(sketch_keys, observed=True, dropna=False)
+    daily_sketch = grouped_rollup.size().index.to_frame(index=False)
+
+    learner_sketches = [
+        build_sketch(learners)
+        for learners in split_learner_sets(
+            grouped_rollup.ngroup().to_numpy(), hash_learner_ids(rollup["learner_id"])
+        )
+    ]
+    for i, column in enumerate(["learners", "registers"]):
+        daily_sketch[column] = pd.Series(
+            [learner_sketch[i] for learner_sketch in learner_sketches],
+            index=daily_sketch.index,
+            dtype=object,
+        )
+    return daily_sketch
+
+
+def update_learners_daily_sketch(daily_sketch, rollup, touched_data):
+    """Rebuild only the sketches of the days with touched rows."""
+    touched_days = pd.unique(get_learner_days(touched_data))
+    return concat_typed_chunks(
+        [
+            daily_sketch[~daily_sketch["date"].isin(touched_days)],
+            build_learners_daily_sketch(rollup[rollup["date"].isin(touched_days)]),
+        ]
+    ).reset_index(drop=True)
+
+
+def extend_id_dictionary(dictionary, ids):
+    """Append the ids missing from an append-only id dictionary.
+
+    The code of an id is its row position in the dictionary, so codes stay
+    the same once assigned.
+    """
+    column = dictionary.columns[0]
+    is_new = pd.Index(dictionary[column]).get_indexer(ids) == -1
+    new_ids = pd.unique(pd.Series(ids)[is_new].dropna())
+    if not len(new_ids):
+        return dictionary
+
+    print(f"Adding {len(new_ids)} new ids to the {column} dictionary")
+    return pd.concat(
+        [dictionary, pd.DataFrame({column: new_ids}).astype(dictionary.dtypes)],
+        ignore_index=True,
+    )
+
+
+def encode_ids(dictionary, ids):
+    """int32 codes of ids in an id dictionary, -1 for ids missing from it."""
+    return pd.Index(dictionary[dictionary.columns[0]]).get_indexer(ids).astype(np.int32)
+
+
+def decode_ids(dictionary, codes):
+    """Ids of int32 codes of an id dictionary, missing for the -1 code."""
+    return dictionary[dictionary.columns[0]].array.take(
+        np.asarray(codes), allow_fill=True
+    )
+
+
+def get_id_dictionary(column):
+    """Cached id dictionary of `column`, or an empty one before it is first built."""
+    blob = redis_client.get(ID_DICTIONARY_KEYS[column])
+    if blob is None:
+        return pd.DataFrame({column: pd.Series(dtype="string")})
+    return deserialize_frame(blob)
+
 
-            store_in_redis(
-                ALL_LEARNER_DATA_KEY, gzip.compress(pickle.dumps(all_learners_data))
+def encode_learners_data_ids(learners_data, fencing_token=None):
+    """Replace the UUID columns of learners data with their int32 codes.
+
+    The id dictionaries are extended with the new ids and stored before any
+    data using their codes is. Columns that are already encoded are left as
+    they are. Returns the encoded data along with all id dictionaries by key.
+    """
+    codes = {}
+    id_dictionaries = {}
+    for column, key in ID_DICTIONARY_KEYS.items():
+        dictionary = get_id_dictionary(column)
+        if learners_data[column].dtype != np.int32:
+            extended_dictionary = extend_id_dictionary(
+                dictionary, learners_data[column]
             )
-            redis_client.set(LAST_FETCHED_TIME_KEY, datetime.now().isoformat())
-            redis_client.set(
-                MAX_TIME_KEY, all_learners_data["updated_at"].max().isoformat()
+            if extended_dictionary is not dictionary or not redis_client.exists(key):
+                store_in_redis(key, serialize_frame(extended_dictionary), fencing_token)
+            dictionary = extended_dictionary
+            codes[column] = encode_ids(dictionary, learners_data[column])
+        id_dictionaries[key] = dictionary
+    return learners_data.assign(**codes), id_dictionaries
+
+
+def build_learners_daily_bitmaps(rollup):
+    """Exact learner sets per day and filter dimension of the rollup.
+
+    One row per day and combination of `LEARNERS_WEEKLY_CUBE_DIMENSIONS`
+    with the sorted codes of its learners, which are merged into bitmaps when
+    counting (see `bitmaps`).
+    """
+    bitmap_keys = ["date"] + LEARNERS_WEEKLY_CUBE_DIMENSIONS
+    grouped_rollup = rollup.groupby(bitmap_keys, observed=True, dropna=False)
+    daily_bitmaps = grouped_rollup.size().index.to_frame(index=False)
+    daily_bitmaps["learners"] = pd.Series(
+        split_learner_sets(
+            grouped_rollup.ngroup().to_numpy(), rollup["learner_id"].to_numpy()
+        ),
+        index=daily_bitmaps.index,
+        dtype=object,
+    )
+    return daily_bitmaps
+
+
+def update_learners_daily_bitmaps(daily_bitmaps, rollup, touched_data):
+    """Rebuild only the learner sets of the days with touched rows."""
+    touched_days = pd.unique(get_learner_days(touched_data))
+    return concat_typed_chunks(
+        [
+            daily_bitmaps[~daily_bitmaps["date"].isin(touched_days)],
+            build_learners_daily_bitmaps(rollup[rollup["date"].isin(touched_days)]),
+        ]
+    ).reset_index(drop=True)
+
+
+def set_current_grade(learner_progress_df):
+    """Add the current grade of every progress group.
+
+    Groups are the `LEARNERS_PROGRESS_KEY_COLUMNS` along with the target grade.
+    The current grade follows from the group's last row in operation and qset
+    grade order. Once that qset grade was completed (its last question was
+    reached or a later grade was attempted) it is "target-achieved" when it is
+    the target grade and the next grade otherwise. Before that it is the qset
+    grade itself. Rows of groups with a missing key are dropped.
+    """
+    group_keys = LEARNERS_PROGRESS_KEY_COLUMNS + ["target_grade"]
+    last_records = (
+        learner_progress_df.dropna(subset=group_keys)
+        .sort_values(group_keys + ["operation_order", "qset_grade_order"])
+        .drop_duplicates(subset=group_keys, keep="last")
+    )
+
+    # Grades are compared and looked up through their qset grade codes
+    qset_grades = last_records["qset_grade"].astype("category")
+    grade_categories = qset_grades.cat.categories
+    qset_grade_codes = qset_grades.cat.codes.to_numpy()
+    target_grade_codes = pd.Categorical(
+        last_records["target_grade"], categories=grade_categories
+    ).codes
+    next_grades = np.array(
+        [next_grade_map.get(grade, grade) for grade in grade_categories] + [np.nan],
+        dtype=object,
+    )
+    current_grades = np.array(list(grade_categories) + [np.nan], dtype=object)
+
+    is_completed = (
+        last_records["is_last"].to_numpy()
+        | last_records["next_grade"].notna().to_numpy()
+    )
+    is_target_achieved = (
+        is_completed
+        & (qset_grade_codes != -1)
+        & (qset_grade_codes == target_grade_codes)
+    )
+    # The -1 code of a missing qset grade picks the trailing missing value
+    current_grade = np.where(
+        is_target_achieved,
+        "target-achieved",
+        np.where(
+            is_completed,
+            next_grades[qset_grade_codes],
+            current_grades[qset_grade_codes],
+        ),
+    )
+
+    return learner_progress_df.merge(
+        last_records[group_keys].assign(current_grade=current_grade),
+        on=group_keys,
+        how="inner",
+    )
+
+
+def build_learners_progress(learners_data):
+    """Progress of every learner through the grades of each operation.
+
+    One row per combination of `LEARNERS_PROGRESS_KEY_COLUMNS` with the
+    learner's starting, target and current grade, from the non-diagnostic
+    rows. A learner's grades are followed across operations within the
+    learner's school, as the Learners Progress page did for a selected school.
+    """
+    learner_progress_df = (
+        learners_data[learners_data["purpose"] != "Main Diagnostic"]
+        .groupby(LEARNERS_PROGRESS_KEY_COLUMNS + ["qset_grade"], observed=True)
+        .agg(is_last=("is_last_question", "any"))
+        .reset_index()
+    )
+
+    learner_progress_df["operation_order"] = learner_progress_df["operation"].map(
+        operations_priority
+    )
+    learner_progress_df["qset_grade_order"] = learner_progress_df["qset_grade"].map(
+        {grade: grade_id for grade_id, grade in grades_priority.items()}
+    )
+
+    order_keys = ["learner_id", "school", "operation_order", "qset_grade_order"]
+    learner_progress_df.sort_values(by=order_keys, inplace=True)
+
+    learner_progress_df["next_grade"] = learner_progress_df.groupby(
+        ["learner_id", "school"], observed=True
+    )["qset_grade"].shift(-1)
+
+    learner_progress_df["target_grade"] = learner_progress_df["grade"].map(
+        target_grade_map
+    )
+
+    # The starting grade is the first qset grade attempted in the operation
+    learner_progress_df = (
+        set_current_grade(learner_progress_df)
+        .sort_values(by=order_keys)
+        .drop_duplicates(subset=LEARNERS_PROGRESS_KEY_COLUMNS)
+        .rename(columns={"qset_grade": "starting_grade"})
+    )
+    return learner_progress_df[
+        LEARNERS_PROGRESS_KEY_COLUMNS
+        + ["starting_grade", "target_grade", "current_grade"]
+    ].reset_index(drop=True)
+
+
+def update_learners_progress(learners_progress, partitions, touched_data):
+    """Rebuild only the progress of the learners with touched rows.
+
+    A learner's progress depends on all of the learner's rows, so every
+    partition is scanned for the rows of the touched learners.
+    """
+    touched_learners = pd.unique(touched_data["learner_id"])
+    learners_data = concat_typed_chunks(
+        [
+            partition.loc[
+                partition["learner_id"].isin(touched_learners),
+                LEARNERS_PROGRESS_DATA_COLUMNS,
+            ]
+            for partition in partitions.values()
+        ]
+    )
+
+    print(f"Rebuilding the progress of {len(touched_learners)} touched learners")
+    return concat_typed_chunks(
+        [
+            learners_progress[~learners_progress["learner_id"].isin(touched_learners)],
+            build_learners_progress(learners_data),
+        ]
+    ).reset_index(drop=True)
+
+
+def get_learner_question_set_keys(learner_ids, question_set_ids):
+    """64-bit key of every (learner, question set) pair of int32 id codes."""
+    return (np.asarray(learner_ids).astype(np.int64) << 32) | (
+        np.asarray(question_set_ids).astype(np.int64) & 0xFFFFFFFF
+    )
+
+
+def build_learners_qset_performance(learners_data):
+    """Totals of every learner's completed question sets.
+
+    One row per learner, question set and the other
+    `LEARNERS_QSET_PERFORMANCE_KEY_COLUMNS`, holding the time spent (the sum
+    over days of last minus first `updated_at`), the score sum and the number
+    of questions, along with the question set's repository and l1 skill. Rows
+    with a missing dimension are left out, as the QSet Performance page did.
+    """
+    completed_data = learners_data[learners_data["status"] == "completed"]
+    # Scores are summed as int32, since the int8 column would overflow
+    question_set_days = (
+        completed_data.assign(
+            date=get_learner_days(completed_data),
+            score=completed_data["score"].astype("int32"),
+        )
+        .groupby(LEARNERS_QSET_PERFORMANCE_KEY_COLUMNS + ["date"], observed=True)
+        .agg(
+            first_updated_at=("updated_at", "min"),
+            last_updated_at=("updated_at", "max"),
+            score=("score", "sum"),
+            count=("score", "count"),
+            repo_name=("repo_name", "first"),
+            l1_skill=("l1_skill", "first"),
+        )
+        .reset_index()
+    )
+    question_set_days["time_spent"] = (
+        question_set_days["last_updated_at"] - question_set_days["first_updated_at"]
+    ).dt.total_seconds()
+
+    return (
+        question_set_days.groupby(LEARNERS_QSET_PERFORMANCE_KEY_COLUMNS, observed=True)
+        .agg(
+            total_time=("time_spent", "sum"),
+            total_score=("score", "sum"),
+            total_count=("count", "sum"),
+            repo_name=("repo_name", "first"),
+            l1_skill=("l1_skill", "first"),
+        )
+        .reset_index()
+    )
+
+
+def update_learners_qset_performance(qset_performance, partitions, touched_data):
+    """Rebuild only the totals of the (learner, question set) pairs with touched rows.
+
+    A learner may work on a question set over several months, so every
+    partition is scanned for the rows of the touched pairs.
+    """
+    touched_keys = np.unique(
+        get_learner_question_set_keys(
+            touched_data["learner_id"], touched_data["question_set_id"]
+        )
+    )
+    learners_data = concat_typed_chunks(
+        [
+            partition.loc[
+                np.isin(
+                    get_learner_question_set_keys(
+                        partition["learner_id"], partition["question_set_id"]
+                    ),
+                    touched_keys,
+                ),
+                LEARNERS_QSET_PERFORMANCE_DATA_COLUMNS,
+            ]
+            for partition in partitions.values()
+        ]
+    )
+    is_touched = np.isin(
+        get_learner_question_set_keys(
+            qset_performance["learner_id"], qset_performance["question_set_id"]
+        ),
+        touched_keys,
+    )
+
+    print(f"Rebuilding {len(touched_keys)} touched learner question sets")
+    return concat_typed_chunks(
+        [
+            qset_performance[~is_touched],
+            build_learners_qset_performance(learners_data),
+        ]
+    ).reset_index(drop=True)
+
+
+def build_derived_learners_data(partitions):
+    """Datasets derived from all learners data partitions, by Redis key."""
+    # Partitions never share a learner-day, so they are rolled up one at a time
+    rollup = concat_typed_chunks(
+        [build_learner_day_rollup(partition) for partition in partitions.values()]
+    ).reset_index(drop=True)
+    derived_data = {
+        LEARNER_DAY_ROLLUP_KEY: rollup,
+        LEARNERS_WEEKLY_CUBE_KEY: build_learners_weekly_cube(rollup),
+        LEARNERS_DAILY_BITMAPS_KEY: build_learners_daily_bitmaps(rollup),
+        LEARNERS_PROGRESS_KEY: build_learners_progress(
+            concat_typed_chunks(
+                [
+                    partition[LEARNERS_PROGRESS_DATA_COLUMNS]
+                    for partition in partitions.values()
+                ]
+            )
+        ),
+        LEARNERS_QSET_PERFORMANCE_KEY: build_learners_qset_performance(
+            concat_typed_chunks(
+                [
+                    partition[LEARNERS_QSET_PERFORMANCE_DATA_COLUMNS]
+                    for partition in partitions.values()
+                ]
+            )
+        ),
+    }
+    if LEARNERS_DAILY_SKETCH_KEY in DERIVED_LEARNERS_DATA_KEYS:
+        derived_data[LEARNERS_DAILY_SKETCH_KEY] = build_learners_daily_sketch(rollup)
+    return derived_data
+
+
+def update_derived_learners_data(partitions, data_version, touched_data):
+    """Derived datasets after a refresh, updating only what the touched rows affect.
+
+    `partitions` are all current partitions and `touched_data` holds the
+    refreshed rows along with the cached rows they replaced.
+    """
+    if not all(redis_client.exists(key) for key in DERIVED_LEARNERS_DATA_KEYS):
+        return build_derived_learners_data(partitions)
+
+    rollup = update_learner_day_rollup(
+        get_local_derived_data(LEARNER_DAY_ROLLUP_KEY, data_version),
+        partitions,
+        touched_data,
+    )
+    derived_data = {
+        LEARNER_DAY_ROLLUP_KEY: rollup,
+        LEARNERS_WEEKLY_CUBE_KEY: update_learners_weekly_cube(
+            get_local_derived_data(LEARNERS_WEEKLY_CUBE_KEY, data_version),
+            rollup,
+            touched_data,
+        ),
+        LEARNERS_DAILY_BITMAPS_KEY: update_learners_daily_bitmaps(
+            get_local_derived_data(LEARNERS_DAILY_BITMAPS_KEY, data_version),
+            rollup,
+            touched_data,
+        ),
+        LEARNERS_PROGRESS_KEY: update_learners_progress(
+            get_local_derived_data(LEARNERS_PROGRESS_KEY, data_version),
+            partitions,
+            touched_data,
+        ),
+        LEARNERS_QSET_PERFORMANCE_KEY: update_learners_qset_performance(
+            get_local_derived_data(LEARNERS_QSET_PERFORMANCE_KEY, data_version),
+            partitions,
+            touched_data,
+        ),
+    }
+    if LEARNERS_DAILY_SKETCH_KEY in DERIVED_LEARNERS_DATA_KEYS:
+        derived_data[LEARNERS_DAILY_SKETCH_KEY] = update_learners_daily_sketch(
+            get_local_derived_data(LEARNERS_DAILY_SKETCH_KEY, data_version),
+            rollup,
+            touched_data,
+        )
+    return derived_data
+
+
+def store_derived_learners_data(derived_data, fencing_token=None):
+    for key, frame in derived_data.items():
+        store_in_redis(key, serialize_frame(frame), fencing_token)
+
+    # Sketches are not kept up to date outside the "hll" mode, so stale ones
+    # are dropped to be rebuilt once the mode is enabled again
+    if LEARNERS_DAILY_SKETCH_KEY not in derived_data:
+        redis_client.delete(LEARNERS_DAILY_SKETCH_KEY)
+
+
+def hash_learners_data_keys(df):
+    """64-bit hash of every row's (learner, question set, question) key."""
+    return pd.util.hash_pandas_object(
+        df[LEARNERS_DATA_KEY_COLUMNS], index=False
+    ).to_numpy()
+
+
+def build_learners_data_key_index(learners_data):
+    """Sorted key hashes of the learners data along with their row positions."""
+    key_hashes = hash_learners_data_keys(learners_data)
+    positions = np.argsort(key_hashes, kind="stable")
+    return key_hashes[positions], positions
+
+
+def build_filter_index(frame, columns):
+    """Posting lists of the rows holding every value of `columns`, by column.
+
+    Every column gets its distinct values along with the row positions sorted
+    by value and the offsets splitting them, so the ascending positions of the
+    rows holding the i-th value are `positions[offsets[i]:offsets[i + 1]]`.
+    Rows with a missing value are not listed under any value.
+    """
+    filter_index = {}
+    for column in columns:
+        codes, values = pd.factorize(frame[column])
+        # Missing values have the -1 code, so their rows are sorted first
+        positions = np.argsort(codes, kind="stable")
+        offsets = np.cumsum(np.bincount(codes + 1, minlength=len(values) + 1))
+        filter_index[column] = (
+            pd.Index(np.asarray(values, dtype=object)),
+            positions,
+            offsets,
+        )
+    return filter_index
+
+
+def select_filtered_positions(filter_index, filters):
+    """Ascending positions of the rows matching all filters of a filter index.
+
+    Filters map columns to a value or a list of values. The posting lists of a
+    column's values are merged, and those of the columns are intersected
+    starting with the shortest. At least one filter must be given.
+    """
+    column_positions = []
+    for column, value in filters.items():
+        values, positions, offsets = filter_index[column]
+        codes = values.get_indexer(
+            list(value) if pd.api.types.is_list_like(value) else [value]
+        )
+        postings = [
+            positions[offsets[code] : offsets[code + 1]]
+            for code in np.unique(codes[codes != -1])
+        ]
+        if not postings:
+            return np.empty(0, dtype=np.intp)
+        column_positions.append(
+            postings[0] if len(postings) == 1 else np.sort(np.concatenate(postings))
+        )
+
+    column_positions.sort(key=len)
+    selected_positions = column_positions[0]
+    for positions in column_positions[1:]:
+        selected_positions = np.intersect1d(
+            selected_positions, positions, assume_unique=True
+        )
+    return selected_positions
+
+
+def get_filtered_rows(frame, filter_index, filters, columns=None):
+    """Only the rows of `frame` matching all filters, gathered through its filter index.
+
+    The posting lists of filter columns missing from `filter_index` are
+    added to it first, so callers can keep the index along with the frame.
+    """
+    filter_index.update(
+        build_filter_index(
+            frame, [column for column in filters if column not in filter_index]
+        )
+    )
+    positions = select_filtered_positions(filter_index, filters)
+    return (frame[columns] if columns else frame).take(positions)
+
+
+def drop_duplicate_learners_data_keys(learners_data):
+    """Keep only the most recently updated row of every key."""
+    return (
+        learners_data.sort_values("updated_at", kind="stable")
+        .drop_duplicates(subset=LEARNERS_DATA_KEY_COLUMNS, keep="last")
+        .reset_index(drop=True)
+    )
+
+
+def upsert_learners_data(partitions, updated_data):
+    """Merge refreshed rows into the learners data partitions by their key columns.
+
+    `partitions` maps partition names to their frame and key index. A refreshed
+    row replaces the cached row with the same key, which is dropped from its old
+    partition when the row moved to a newer month. Keys are looked up with a
+    binary search over each partition's key index, so only the refreshed rows
+    are hashed. Returns only the partitions that changed, along with the cached
+    rows that were replaced, both with the columns of the refreshed rows.
+    """
+    columns = next(iter(partitions.values()))[0].columns if partitions else None
+    updated_data = drop_duplicate_learners_data_keys(updated_data)
+    if columns is not None:
+        updated_data = updated_data[columns]
+    updated_hashes = hash_learners_data_keys(updated_data)
+
+    # Find the cached row of every refreshed key, if there is one
+    is_replacement = np.zeros(len(updated_data), dtype=bool)
+    replaced_positions = {}
+    replaced_chunks = []
+    for partition_name, (partition, (sorted_hashes, positions)) in partitions.items():
+        if not len(sorted_hashes):
+            continue
+        found_at = np.minimum(
+            np.searchsorted(sorted_hashes, updated_hashes), len(sorted_hashes) - 1
+        )
+        is_found = sorted_hashes[found_at] == updated_hashes
+        if not is_found.any():
+            continue
+
+        # Guard against hash collisions by comparing the actual keys
+        found_positions = positions[found_at[is_found]]
+        is_same_key = (
+            partition[LEARNERS_DATA_KEY_COLUMNS]
+            .iloc[found_positions]
+            .to_numpy(dtype=object)
+            == updated_data.loc[is_found, LEARNERS_DATA_KEY_COLUMNS].to_numpy(
+                dtype=object
+            )
+        ).all(axis=1)
+        replaced_positions[partition_name] = found_positions[is_same_key]
+        replaced_chunks.append(
+            partition.iloc[replaced_positions[partition_name]][updated_data.columns]
+        )
+        is_replacement[np.flatnonzero(is_found)[is_same_key]] = True
+
+    # Rewrite the partitions that lost replaced rows or received refreshed ones
+    updated_partitions = split_learners_data_into_partitions(updated_data)
+    changed_partitions = {}
+    for partition_name in sorted(set(replaced_positions) | set(updated_partitions)):
+        chunks = []
+        if partition_name in partitions:
+            partition = partitions[partition_name][0]
+            is_kept = np.ones(len(partition), dtype=bool)
+            is_kept[replaced_positions.get(partition_name, [])] = False
+            chunks.append(partition.loc[is_kept, updated_data.columns])
+        if partition_name in updated_partitions:
+            chunks.append(updated_partitions[partition_name])
+        changed_partitions[partition_name] = concat_typed_chunks(chunks).reset_index(
+            drop=True
+        )
+
+    print(
+        f"Merged {is_replacement.sum()} updated and {(~is_replacement).sum()} "
+        f"new learner records into {len(changed_partitions)} partitions"
+    )
+    replaced_data = concat_typed_chunks(replaced_chunks) if replaced_chunks else None
+    return changed_partitions, replaced_data
+
+
+def migrate_learners_data_blob(fencing_token=None):
+    """Split a learners frame cached as a single blob into month partitions."""
+    print(f"Splitting {ALL_LEARNER_DATA_KEY} into month partitions")
+    learners_data = drop_duplicate_learners_data_keys(
+        deserialize_frame(redis_client.get(ALL_LEARNER_DATA_KEY))
+    )
+    store_all_learners_data_partitions(learners_data, fencing_token)
+    redis_client.delete(ALL_LEARNER_DATA_KEY)
+
+
+def repartition_learners_data(fencing_token=None):
+    """Rewrite the cached partitions after `LEARNERS_DATA_SHARDING` was changed.
+
+    Partitions cached before their UUID columns were encoded, before they
+    were stored column by column or without all `LEARNERS_DATA_DERIVED_COLUMNS`
+    are rewritten the same way.
+    """
+    print(
+        f"Repartitioning {ALL_LEARNER_DATA_KEY} for {config.LEARNERS_DATA_SHARDING} sharding"
+    )
+    partitions = get_local_learners_data_partitions(
+        redis_client.get(LEARNERS_DATA_VERSION_KEY)
+    )
+    frames = [partition for partition, _ in partitions.values()]
+    # Partitions cached at different times may lack some of the derived
+    # columns, which are filled in again for all of them
+    common_columns = [
+        column
+        for column in frames[0].columns
+        if all(column in frame for frame in frames)
+    ]
+    learners_data = concat_typed_chunks([frame[common_columns] for frame in frames])
+    store_all_learners_data_partitions(learners_data, fencing_token)
+
+
+def fetch_all_data(fencing_token=None):
+    """Refresh all cached datasets, returning the number of learner rows ingested."""
+    updated_reference_keys = update_cache(fencing_token)
+    rows_ingested = 0
+
+    manifest = get_learners_data_manifest()
+    if not manifest and redis_client.exists(ALL_LEARNER_DATA_KEY):
+        migrate_learners_data_blob(fencing_token)
+    elif not all(
+        is_current_learners_data_partition(partition) for partition in manifest.values()
+    ):
+        repartition_learners_data(fencing_token)
+
+    # An empty manifest cached by an empty load is loaded again in full
+    if get_learners_data_manifest():
+        data_version = redis_client.get(LEARNERS_DATA_VERSION_KEY)
+        partitions = get_local_learners_data_partitions(data_version)
+        if LAST_QUESTION_PER_QSET_GRADE_KEY in updated_reference_keys or any(
+            "is_last_question" not in partition for partition, _ in partitions.values()
+        ):
+            data_version = update_learners_data_last_questions(
+                partitions, fencing_token
+            )
+            partitions = get_local_learners_data_partitions(data_version)
+        # Partitions without rows or dates have no maximum, which is skipped
+        max_updated_at = pd.Series(
+            [
+                pd.to_datetime(partition["updated_at"]).max()
+                for partition, _ in partitions.values()
+            ]
+        ).max()
+        updated_data = get_learners_data(
+            max_updated_at if pd.notna(max_updated_at) else None
+        )
+
+        if not updated_data.empty:
+            updated_data, id_dictionaries = encode_learners_data_ids(
+                process_learners_data(updated_data), fencing_token
+            )
+            changed_partitions, replaced_data = upsert_learners_data(
+                partitions, updated_data
+            )
+            manifest = store_learners_data_partitions(changed_partitions, fencing_token)
+
+            current_partitions = {
+                partition_name: partition
+                for partition_name, (partition, _) in partitions.items()
+            }
+            current_partitions.update(changed_partitions)
+            derived_data = update_derived_learners_data(
+                current_partitions,
+                data_version,
+                concat_typed_chunks(
+                    [updated_data]
+                    + ([replaced_data] if replaced_data is not None else [])
+                ),
+            )
+            store_derived_learners_data(derived_data, fencing_token)
+            publish_learners_data_version(
+                manifest,
+                changed_partitions,
+                fencing_token,
+                {**derived_data, **id_dictionaries},
             )
+            redis_client.set(LAST_FETCHED_TIME_KEY, datetime.now().isoformat())
+            redis_client.set(MAX_TIME_KEY, updated_data["updated_at"].max().isoformat())
 
+            rows_ingested = updated_data.shape[0]
             print(
                 f"Updated cache with {updated_data.shape[0]} new records for {ALL_LEARNER_DATA_KEY}"
             )
         else:
+            # Data cached before data versions existed still needs a version
+            redis_client.setnx(LEARNERS_DATA_VERSION_KEY, 1)
+            # So do datasets derived from the data since it was cached
+            if not all(redis_client.exists(key) for key in DERIVED_LEARNERS_DATA_KEYS):
+                store_derived_learners_data(
+                    build_derived_learners_data(
+                        {
+                            partition_name: partition
+                            for partition_name, (partition, _) in partitions.items()
+                        }
+                    ),
+                    fencing_token,
+                )
             redis_client.set(LAST_FETCHED_TIME_KEY, datetime.now().isoformat())
             print(f"No new updates for {ALL_LEARNER_DATA_KEY}. Returning cached data.")
     else:
         all_learners_data = get_learners_data()
-        all_learners_data = process_learners_data(all_learners_data)
-
-        store_in_redis(
-            ALL_LEARNER_DATA_KEY, gzip.compress(pickle.dumps(all_learners_data))
+        all_learners_data = drop_duplicate_learners_data_keys(
+            process_learners_data(all_learners_data)
         )
+
+        store_all_learners_data_partitions(all_learners_data, fencing_token)
         redis_client.set(LAST_FETCHED_TIME_KEY, datetime.now().isoformat())
-        redis_client.set(
-            MIN_TIME_KEY, all_learners_data["updated_at"].min().isoformat()
-        )
-        redis_client.set(
-            MAX_TIME_KEY, all_learners_data["updated_at"].max().isoformat()
-        )
+        if not all_learners_data.empty:
+            redis_client.set(
+                MIN_TIME_KEY, all_learners_data["updated_at"].min().isoformat()
+            )
+            redis_client.set(
+                MAX_TIME_KEY, all_learners_data["updated_at"].max().isoformat()
+            )
+        rows_ingested = all_learners_data.shape[0]
 
     print("Updated cache with new data for all keys")
+    return rows_ingested
 
 
-def get_data(key):
-    return get_cached_data(key)
+def get_data(
+    key, columns=None, from_date=None, to_date=None, tenant=None, filters=None
+):
+    return get_cached_data(key, columns, from_date, to_date, tenant, filters)
 
 
-def get_all_learners_data_df():
-    return get_data(ALL_LEARNER_DATA_KEY)
+def get_learners_data_filters(
+    tenant=None, school=None, grade=None, operation=None, purpose=None
+):
+    """Filters on the learners data columns, by column, leaving out empty ones.
+
+    Every filter takes a value or a list of values.
+    """
+    return {
+        LEARNERS_DATA_FILTER_COLUMNS[name]: value
+        for name, value in [
+            ("tenant", tenant),
+            ("school", school),
+            ("grade", grade),
+            ("operation", operation),
+            ("purpose", purpose),
+        ]
+        if value is not None and len(value)
+    }
+
+
+def get_all_learners_data_df(
+    columns=None,
+    from_date=None,
+    to_date=None,
+    tenant=None,
+    school=None,
+    grade=None,
+    operation=None,
+    purpose=None,
+):
+    """Learners data frame, decoding only `columns` when they are given.
+
+    `from_date`/`to_date` limit the load to the month partitions overlapping
+    that range; rows outside it still have to be filtered out by the caller.
+    `tenant` returns only that tenant's rows. The `school`, `grade`,
+    `operation` and `purpose` filters (a value or a list of values) are
+    resolved through the partitions' filter indexes, so only matching rows
+    are gathered.
+    """
+    return get_data(
+        ALL_LEARNER_DATA_KEY,
+        columns,
+        from_date,
+        to_date,
+        tenant if isinstance(tenant, str) else None,
+        get_learners_data_filters(tenant, school, grade, operation, purpose),
+    )
+
+
+def get_learners_columns(
+    columns,
+    from_date=None,
+    to_date=None,
+    tenant=None,
+    school=None,
+    grade=None,
+    operation=None,
+    purpose=None,
+):
+    """Only `columns` of the learners rows matching the given filters.
+
+    Rows are kept when updated on `from_date`, `to_date` or the days between.
+    The other filters take a value or a list of values, and empty filters
+    are ignored. Only the partitions overlapping the dates (and the tenant's
+    shards) are loaded, of those only `columns`, the filtered columns and
+    the rows the filter indexes select.
+    """
+    learners_data = get_all_learners_data_df(
+        list(dict.fromkeys(columns + ["updated_at"])),
+        from_date,
+        to_date,
+        tenant,
+        school,
+        grade,
+        operation,
+        purpose,
+    )
+
+    is_kept = np.ones(len(learners_data), dtype=bool)
+    # Dates are compared in the timezone of `updated_at`, like `.dt.date`
+    updated_at = learners_data["updated_at"]
+    if from_date:
+        is_kept &= (
+            updated_at >= pd.Timestamp(from_date).tz_localize(updated_at.dt.tz)
+        ).to_numpy()
+    if to_date:
+        is_kept &= (
+            updated_at
+            < (pd.Timestamp(to_date) + timedelta(days=1)).tz_localize(updated_at.dt.tz)
+        ).to_numpy()
+    return learners_data.loc[is_kept, columns]
+
+
+def get_learner_day_rollup_df(columns=None):
+    """Learner-day rollup of the learners data (see `build_learner_day_rollup`)."""
+    return get_data(LEARNER_DAY_ROLLUP_KEY, columns)
+
+
+def get_learners_weekly_cube_df(columns=None):
+    """Weekly metric cube of the learners data (see `build_learners_weekly_cube`)."""
+    return get_data(LEARNERS_WEEKLY_CUBE_KEY, columns)
+
+
+def get_learners_daily_bitmaps_df(columns=None):
+    """Daily exact learner sets (see `build_learners_daily_bitmaps`)."""
+    return get_data(LEARNERS_DAILY_BITMAPS_KEY, columns)
+
+
+def get_learners_progress_df(columns=None):
+    """Progress of every learner per operation (see `build_learners_progress`)."""
+    return get_data(LEARNERS_PROGRESS_KEY, columns)
+
+
+def get_learners_qset_performance_df(columns=None, filters=None):
+    """Learners' completed question set totals (see `build_learners_qset_performance`).
+
+    `filters` map columns to a value or a list of values, and only the
+    matching rows are gathered through the totals' filter index.
+    """
+    return get_data(LEARNERS_QSET_PERFORMANCE_KEY, columns, filters=filters)
+
+
+def get_id_codes(column, ids):
+    """int32 codes of the UUIDs of an id column, -1 for ids never ingested.
+
+    Used to match ids from outside the learners data, e.g. reference data or
+    a selected table row, against its encoded id columns.
+    """
+    return encode_ids(get_data(ID_DICTIONARY_KEYS[column]), ids)
+
+
+def get_ids(column, codes):
+    """UUIDs of the int32 codes of an id column, for display."""
+    return decode_ids(get_data(ID_DICTIONARY_KEYS[column]), codes)
+
+
+def get_learners_daily_sketch_df(columns=None):
+    """Daily distinct learner sketches (see `build_learners_daily_sketch`)."""
+    return get_data(LEARNERS_DAILY_SKETCH_KEY, columns)
 
 
 def get_repository_names_list():
@@ -535,13 +2719,16 @@ def last_synced_time():
     return last_synced_at.decode("utf-8")
 
 
-def get_non_diagnostic_data():
+def get_non_diagnostic_data(columns=None):
     print("Fetching non_diagnostic_data")
-    all_learners_data = get_all_learners_data_df()
+    # 'purpose' is always needed to filter out the diagnostic records
+    all_learners_data = get_all_learners_data_df(
+        columns + ["purpose"] if columns and "purpose" not in columns else columns
+    )
     non_diagnostic_data = all_learners_data[
         all_learners_data["purpose"] != "Main Diagnostic"
     ]
-    return non_diagnostic_data
+    return non_diagnostic_data[columns] if columns else non_diagnostic_data
 
 
 def get_all_learners_df():
@@ -2,9 +2,8 @@ import dash
 import pandas as pd
 from dash import Dash, dash_table, dcc, html, Input, Output, callback
 from db_utils import (
-    get_last_question_per_qset_grade_df,
     get_grades_list,
-    get_non_diagnostic_data,
+    get_learners_progress_df,
     get_schools_list,
 )
 
@@ -35,43 +34,6 @@ operations_priority = {
 }
 
 
-def set_curr_grade(group):
-    group.sort_values(
-        by=["operation_order", "qset_grade_order"], ascending=[True, True], inplace=True
-    )
-    last_record = group.iloc[-1]
-    target_grade = last_record["target_grade"]
-    qset_grade = last_record["qset_grade"]
-    next_grade = last_record["next_grade"]
-    curr_grade = qset_grade
-
-    if last_record["is_last"] or not pd.isna(next_grade):
-        if target_grade == qset_grade:
-            curr_grade = "target-achieved"
-        elif qset_grade == "class-one":
-            curr_grade = "class-two"
-        elif qset_grade == "class-two":
-            curr_grade = "class-three"
-        elif qset_grade == "class-three":
-            curr_grade = "class-four"
-        elif qset_grade == "class-four":
-            curr_grade = "class-five"
-        elif qset_grade == "class-five":
-            curr_grade = "class-six"
-
-    group["current_grade"] = curr_grade
-    return group
-
-
-target_grade_map = {
-    "class-two": "class-one",
-    "class-three": "class-two",
-    "class-four": "class-three",
-    "class-five": "class-four",
-    "class-six": "class-five",
-}
-
-
 def get_school_options():
     # Get the list of schools from the database
     school_options = [
@@ -85,87 +47,18 @@ def get_school_options():
     Input("dig-l-prog-schools-dropdown", "value"),
 )
 def update_table(selected_school):
-    non_diagnostic_data = get_non_diagnostic_data()[
-        [
-            "operation",
-            "qset_grade",
-            "question_set_id",
-            "question_id",
-            "school",
-            "learner_id",
-            "grade",
-        ]
-    ]
-    last_question_per_qset_grade = get_last_question_per_qset_grade_df()
-
-    learner_progress_data = pd.merge(
-        non_diagnostic_data,
-        last_question_per_qset_grade,
-        on=["operation", "qset_grade", "question_set_id", "question_id"],
-        how="left",
-        indicator=True,
-    )
-    learner_progress_data["is_found"] = learner_progress_data["_merge"] == "both"
-    learner_progress_data.drop(columns=["_merge"], inplace=True)
+    learners_progress = get_learners_progress_df()
 
     if selected_school:
-        learner_progress_df = learner_progress_data[
-            learner_progress_data["school"] == selected_school
+        learner_progress_df = learners_progress[
+            learners_progress["school"] == selected_school
         ].copy()
     else:
-        learner_progress_df = learner_progress_data.copy()
-
-    learner_progress_df = (
-        learner_progress_df.groupby(
-            ["learner_id", "grade", "operation", "qset_grade"], observed=True
-        )
-        .agg(is_last=("is_found", "any"))
-        .reset_index()
-    )
-
-    learner_progress_df["operation_order"] = learner_progress_df["operation"].map(
-        operations_priority
-    )
+        learner_progress_df = learners_progress.copy()
 
     grades = get_grades_list()
     grades_priority = grades.set_index("grade").to_dict().get("id")
 
-    learner_progress_df["qset_grade_order"] = learner_progress_df["qset_grade"].map(
-        grades_priority
-    )
-
-    learner_progress_df.sort_values(
-        by=["learner_id", "operation_order", "qset_grade_order"],
-        ascending=[True, True, True],
-        inplace=True,
-    )
-
-    learner_progress_df["next_grade"] = learner_progress_df.groupby(
-        "learner_id", observed=True
-    )["qset_grade"].shift(-1)
-
-    learner_progress_df["target_grade"] = learner_progress_df["grade"].map(
-        target_grade_map
-    )
-
-    learner_progress_df = (
-        learner_progress_df.groupby(
-            ["learner_id", "operation", "grade", "target_grade"], observed=True
-        )
-        .apply(set_curr_grade)
-        .reset_index(drop=True)
-    )
-
-    learner_progress_df.sort_values(
-        by=["learner_id", "operation_order", "qset_grade_order"],
-        ascending=[True, True, True],
-        inplace=True,
-    )
-
-    learner_progress_df["starting_grade"] = learner_progress_df.groupby(
-        ["learner_id", "grade", "operation"], observed=True
-    )["qset_grade"].transform("first")
-
     learner_progress_df["learners_count"] = learner_progress_df.groupby(
         ["operation", "starting_grade", "grade"], observed=True
     )["learner_id"].transform("nunique")
@@ -1,22 +1,37 @@
+from bitmaps import count_bitmap, merge_bitmaps, subtract_bitmap
+import config
 import dash
 from db_utils import (
     get_all_learners_data_df,
     get_logged_in_users_data_df,
     get_all_learners_df,
     get_grades_list,
+    get_id_codes,
+    get_ids,
+    get_learner_day_rollup_df,
+    get_learners_daily_bitmaps_df,
+    get_learners_columns,
+    get_learners_daily_sketch_df,
+    get_learners_weekly_cube_df,
+    get_memoized_result,
     get_min_max_timestamp,
     get_qset_types_list,
     get_question_sequence_data_df,
     get_schools_list,
     get_tenants_list,
+    get_week_ranges,
     last_synced_time,
 )
 import numpy as np
 import pandas as pd
 import pytz
 import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dash import Dash, Input, Output, State, callback, dash_table, dcc, html, no_update
 from datetime import datetime, timedelta
+from functools import partial
+from sketches import estimate_distinct, merge_sketches, standard_error
 
 
 # Register the page
@@ -71,10 +86,12 @@ def generate_week_ranges(from_date, to_date):
     return week_ranges
 
 
-def calculate_range(date):
-    week_start = date - timedelta(days=date.weekday())
-    week_end = week_start + timedelta(days=6)
-    return f"{week_start.strftime('%Y-%m-%d')},{week_end.strftime('%Y-%m-%d')}"
+# The overall counts span all dates unless both dates are selected, so only then
+# can the learners data be loaded for the selected range alone
+def get_learners_data_date_range(from_date, to_date):
+    if from_date and to_date:
+        return from_date, to_date
+    return None, None
 
 
 operations_priority = {
@@ -86,14 +103,36 @@ operations_priority = {
 
 
 # Define the logic for applying diff based on the sum of 'time_diff_clipped'
-def apply_diff_or_copy(group):
-    if group["time_diff_clipped"].sum() > 2700:
-        # Apply diff only if sum of 'time_diff_clipped' > threshold
-        group.loc[:, "time_diff_clipped"] = group["time_diff_clipped"].diff(1).abs()
-    else:
-        # If sum is <= threshold, keep 'time_diff_clipped' values
-        group.loc[:, "time_diff_clipped"] = group["time_diff_clipped"]
-    return group
+# Within every learner-day whose 'time_diff_clipped' adds up to more than the threshold,
+# replace it by the difference from the previous row, otherwise keep it as it is.
+# The column is replaced in `data` itself, so callers pass a frame they own
+def apply_diff_or_copy(data):
+    time_diff_by_day = data.groupby(["learner_id", "date"], observed=True)[
+        "time_diff_clipped"
+    ]
+    is_over_threshold = time_diff_by_day.transform("sum") > 2700
+    data["time_diff_clipped"] = data["time_diff_clipped"].mask(
+        is_over_threshold, time_diff_by_day.diff(1).abs()
+    )
+    return data
+
+
+# Time spent by every learner on every date, from the learner-day rollup
+def get_learner_day_time_spent(learner_days):
+    learner_days = (
+        learner_days.groupby(["learner_id", "date"], observed=True)
+        .agg(
+            min_time=("first_updated_at", "min"), max_time=("last_updated_at", "max")
+        )
+        .reset_index()
+    )
+    learner_days["time_diff"] = (
+        learner_days["max_time"] - learner_days["min_time"]
+    ).dt.total_seconds()
+
+    # Set maximum value of 'time_diff' to 45 minutes = 2700 seconds
+    learner_days["time_diff"] = learner_days["time_diff"].clip(upper=2700)
+    return learner_days
 
 
 def get_all_learners_options(school: str = ""):
@@ -135,7 +174,7 @@ def update_learners_options(selected_school: str):
 
 # Create Grade Jump Data
 def get_grade_jump_data():
-    grade_jump_data = get_all_learners_data_df()[
+    grade_jump_data = get_learner_day_rollup_df(
         [
             "learner_id",
             "tenant_name",
@@ -143,18 +182,18 @@ def get_grade_jump_data():
             "grade",
             "operation",
             "qset_grade",
-            "updated_at",
+            "date",
             "purpose",
+            "first_updated_at",
+            "last_updated_at",
         ]
-    ]
+    )
 
     # Filtering the data as per the purpose column
     grade_jump_data = grade_jump_data[grade_jump_data["purpose"] != "Main Diagnostic"]
 
     # If the filtered data is empty, handle accordingly
     if not grade_jump_data.empty:
-        grade_jump_data.loc[:, "date"] = grade_jump_data["updated_at"].dt.date
-
         # Aggregating data
         grade_jump_data = (
             grade_jump_data.groupby(
@@ -169,7 +208,10 @@ def get_grade_jump_data():
                 ],
                 observed=True,
             )
-            .agg(min_time=("updated_at", "min"), max_time=("updated_at", "max"))
+            .agg(
+                min_time=("first_updated_at", "min"),
+                max_time=("last_updated_at", "max"),
+            )
             .reset_index()
         )
 
@@ -188,9 +230,7 @@ def get_grade_jump_data():
         )
 
         # Apply the diff function to each group of 'learner_id' and 'date'
-        grade_jump_data = grade_jump_data.groupby(
-            ["learner_id", "date"], observed=True
-        ).apply(apply_diff_or_copy)
+        grade_jump_data = apply_diff_or_copy(grade_jump_data)
         grade_jump_data.reset_index(drop=True, inplace=True)
         grade_jump_data["time_diff_clipped"] = grade_jump_data[
             "time_diff_clipped"
@@ -212,27 +252,30 @@ def get_grade_jump_data():
 
 # Create Operator Jump Data
 def get_operator_jump_data():
-    operator_jump_data = get_all_learners_data_df()[
+    operator_jump_data = get_learner_day_rollup_df(
         [
             "learner_id",
             "tenant_name",
             "school",
             "grade",
             "operation",
-            "updated_at",
+            "date",
+            "first_updated_at",
+            "last_updated_at",
         ]
-    ]
+    )
 
     if not operator_jump_data.empty:
-        operator_jump_data.loc[:, "date"] = operator_jump_data["updated_at"].dt.date
-
         # Aggregating data
         operator_jump_data = (
             operator_jump_data.groupby(
                 ["learner_id", "tenant_name", "school", "grade", "operation", "date"],
                 observed=True,
             )
-            .agg(min_time=("updated_at", "min"), max_time=("updated_at", "max"))
+            .agg(
+                min_time=("first_updated_at", "min"),
+                max_time=("last_updated_at", "max"),
+            )
             .reset_index()
         )
 
@@ -250,9 +293,7 @@ def get_operator_jump_data():
         )
 
         # Apply the diff function to each group of 'learner_id' and 'date'
-        operator_jump_data = operator_jump_data.groupby(
-            ["learner_id", "date"], observed=True
-        ).apply(apply_diff_or_copy)
+        operator_jump_data = apply_diff_or_copy(operator_jump_data)
         operator_jump_data.reset_index(drop=True, inplace=True)
         operator_jump_data["time_diff_clipped"] = operator_jump_data[
             "time_diff_clipped"
@@ -275,224 +316,6 @@ def get_operator_jump_data():
 # WEEK WISE: By default, It displays the metrics calculated at week level for last 6 weeks but the weeks updates based on selected date range.
 
 
-""" UNIQUE LEARNERS """
-########################## - OVERALL
-
-
-# Q: What are overall unique learners?
-# - All the learners who have attempted/solved even a single question on digital app are overall unique learners
-# - There are sub-divisions of unique learners based on operation - 'Addition', 'Subtraction', 'Multiplication', 'Division'
-# - These subdivisions tell that how many unique learners have attempted questions of these operations till now
-def get_overall_unique_learners(uni_learners_df, from_date: str, to_date: str):
-    # Create a copy of the all_learners_data DataFrame
-    # uni_learners_df = all_learners_data.copy()
-
-    # Filter the DataFrame based on the provided date range if both from_date and to_date are provided
-    if from_date and to_date:
-        uni_learners_df = uni_learners_df[
-            (uni_learners_df["updated_at"].dt.date >= from_date)
-            & (uni_learners_df["updated_at"].dt.date <= to_date)
-        ]
-
-    # Count distinct learners
-    overall_count = uni_learners_df["learner_id"].nunique()
-    # Create a DataFrame to hold the overall count
-    overall_count_df = pd.DataFrame([{"overall_count": overall_count}])
-
-    # Group the DataFrame by 'operation' and count unique learners for each operation
-    op_wise_uni_learners_df = (
-        uni_learners_df.groupby(["operation"], observed=True)["learner_id"]
-        .nunique()
-        .reset_index(name="overall_count")
-    )
-    # Define a list of operations to consider
-    operators_ls = ["Addition", "Subtraction", "Multiplication", "Division"]
-    # Reindex the operation-wise unique learners DataFrame to include all operations, even if they have no learners
-    op_wise_uni_learners_df = op_wise_uni_learners_df.set_index("operation").reindex(
-        operators_ls, fill_value=pd.NA
-    )
-    # Reset the index to remove the operation as index
-    op_wise_uni_learners_df = op_wise_uni_learners_df.reset_index(drop=True)
-    # Concatenate the overall count DataFrame with the operation-wise unique learners DataFrame
-    overall_uni_learners_df = pd.concat(
-        [overall_count_df, op_wise_uni_learners_df]
-    ).reset_index(drop=True)
-
-    return overall_uni_learners_df
-
-
-########################## - WEEK WISE
-
-
-# The definition of unique learners is same as above. The difference is that here the data will be generated for per week.
-# The Number of learners solved/attempted even a single question in that week.
-def get_unique_learners(from_date, to_date, school, grade, operation, tenant):
-    unique_learners_data = get_all_learners_data_df()[
-        ["updated_at", "school", "grade", "operation", "tenant_name", "learner_id"]
-    ]
-
-    # Identify learners who were active before the start date
-    previous_learners_list = unique_learners_data[
-        unique_learners_data["updated_at"].dt.date < from_date
-    ]["learner_id"].unique()
-
-    # Filter learners of selected school
-    if school:
-        unique_learners_data = unique_learners_data[
-            unique_learners_data["school"] == school
-        ]
-
-    # Filter learners of selected grade
-    if grade:
-        unique_learners_data = unique_learners_data[
-            unique_learners_data["grade"] == grade
-        ]
-    # Filter learners who have performed selected operation
-    if operation:
-        unique_learners_data = unique_learners_data[
-            unique_learners_data["operation"] == operation
-        ]
-    # Filter learners of selected tenant
-    if tenant:
-        unique_learners_data = unique_learners_data[
-            unique_learners_data["tenant_name"] == tenant
-        ]
-
-    # Fetch overall unique learners count
-    overall_unique_learners = get_overall_unique_learners(
-        unique_learners_data.copy(), from_date, to_date
-    )
-
-    # Filter learners records after from_date
-    if from_date:
-        unique_learners_data = unique_learners_data[
-            unique_learners_data["updated_at"].dt.date >= from_date
-        ]
-
-    # Filter learners records till to_date
-    if to_date:
-        unique_learners_data = unique_learners_data[
-            unique_learners_data["updated_at"].dt.date <= to_date
-        ]
-
-    if not unique_learners_data.empty:
-        # Extract date as 'updated_date' from 'updated_at' column
-        unique_learners_data["updated_date"] = unique_learners_data[
-            "updated_at"
-        ].dt.date
-
-        # Get unique learners active on every date
-        unique_learners_data = unique_learners_data.drop_duplicates(
-            subset=["learner_id", "operation", "updated_date"]
-        )
-
-        # Map week range to every entry based on date
-        unique_learners_data.loc[:, "week_range"] = unique_learners_data[
-            "updated_date"
-        ].apply(lambda x: calculate_range(x))
-
-        # Get unique learners active within a week
-        final_unique_learners_df = unique_learners_data.drop_duplicates(
-            subset=["learner_id", "operation", "week_range"]
-        ).copy()
-
-        # Rename 'learner_id' to active learners
-        final_unique_learners_df.rename(
-            columns={"learner_id": "active_learners"}, inplace=True
-        )
-
-        # Create pivot table for weekly representation of unique learners count
-        weekly_uni_lrs_cnt_table = pd.pivot_table(
-            final_unique_learners_df,
-            columns="week_range",  # columns
-            values="active_learners",  # Values to aggregate
-            aggfunc="nunique",  # Aggregation function
-            observed=True,
-        ).reset_index(names=["metrics"])
-
-        weekly_uni_lrs_cnt_table.loc[0, "metrics"] = "active learners"
-    else:
-        weekly_uni_lrs_cnt_table = pd.DataFrame({"metrics": ["active learners"]})
-        final_unique_learners_df = pd.DataFrame(
-            columns=["active_learners", "operation", "updated_date", "week_range"]
-        )
-
-    operators_ls = ["Addition", "Subtraction", "Multiplication", "Division"]
-    if not final_unique_learners_df.empty:
-        # Create pivot table for weekly representation of operation wise unique learners count
-        op_wise_weekly_uni_lrs_cnt_table = pd.pivot_table(
-            final_unique_learners_df,
-            index="operation",
-            columns="week_range",  # columns
-            values="active_learners",  # Values to aggregate
-            aggfunc="nunique",  # Aggregation function
-            observed=True,
-        )
-
-        op_wise_weekly_uni_lrs_cnt_table = op_wise_weekly_uni_lrs_cnt_table.reindex(
-            operators_ls, fill_value=pd.NA
-        )
-        op_wise_weekly_uni_lrs_cnt_table = (
-            op_wise_weekly_uni_lrs_cnt_table.reset_index().rename(
-                columns={"operation": "sub_metrics"}
-            )
-        )
-    else:
-        op_wise_weekly_uni_lrs_cnt_table = pd.DataFrame(
-            {"sub_metrics": ["Addition", "Subtraction", "Multiplication", "Division"]}
-        )
-
-    weekly_uni_lrs_cnt_table = pd.concat(
-        [weekly_uni_lrs_cnt_table, op_wise_weekly_uni_lrs_cnt_table]
-    )
-
-    # Calculate new learners added
-    weekly_new_learners_added = get_new_learners_added(
-        final_unique_learners_df, previous_learners_list
-    )
-
-    return overall_unique_learners, weekly_uni_lrs_cnt_table, weekly_new_learners_added
-
-
-""" NEW LEARNERS ADDED """
-########################## - WEEK WISE
-
-
-# Q: What are new learners added?
-# - The number of learners who have started attempting questions on digital app from that week.
-# - That's why this data is based on weeks. It simply calculates the learners record found till that week.
-# - It signifies learners who were already enrolled.
-# - And, Subtract those learners from learners having records in that week. This will provide the new learners if added that week.
-def get_new_learners_added(learners_added_df, previous_learners_list):
-    # Sort the data based on the 'updated_date' column to ensure chronological order
-    learners_added_df = learners_added_df.sort_values("updated_date")
-
-    # Initialize a set to track learner_ids seen in previous weeks for efficient lookup
-    previous_learners = set(previous_learners_list)
-
-    # Define a function to calculate the count of new learners for a given week
-    def count_new_learners_for_week(current_week, current_learners):
-        # Identify learners in the current week who have not appeared in previous weeks
-        new_learners = [
-            learner for learner in current_learners if learner not in previous_learners
-        ]
-        # Update the 'previous_learners' set with the current week's learners to keep track of all seen learners
-        previous_learners.update(current_learners)
-        return len(new_learners)
-
-    # Apply the 'count_new_learners_for_week' function to each week in the DataFrame to calculate new learners added
-    learners_added_df["new learners added"] = learners_added_df.groupby("week_range")[
-        "active_learners"
-    ].transform(lambda x: count_new_learners_for_week(x.name, x.tolist()))
-
-    # Use a pivot table to reshape the data and get the count of new learners added per week
-    weekly_new_learners_added = learners_added_df.pivot_table(
-        values="new learners added", columns="week_range", observed=True
-    ).reset_index(names=["metrics"])
-
-    return weekly_new_learners_added
-
-
 """ LOGGED IN USERS """
 ########################## - OVERALL
 
@@ -586,9 +409,9 @@ def get_logged_in_users(
 
     if not logged_in_users_data.empty:
         # Map week range to every entry based on date
-        logged_in_users_data.loc[:, "week_range"] = logged_in_users_data[
-            "logged_in_date"
-        ].apply(lambda x: calculate_range(x))
+        logged_in_users_data["week_range"] = get_week_ranges(
+            logged_in_users_data["logged_in_date"]
+        )
 
         # Rename 'learner_id' to 'logged_in_learners'
         logged_in_users_data.rename(
@@ -627,8 +450,8 @@ def get_overall_sessions(uni_sessions_df, from_date: str, to_date: str):
     if from_date and to_date:
         # Filter the DataFrame to include only records within the specified date range
         uni_sessions_df = uni_sessions_df[
-            (uni_sessions_df["updated_at"].dt.date >= from_date)
-            & (uni_sessions_df["updated_at"].dt.date <= to_date)
+            (uni_sessions_df["date"].dt.date >= from_date)
+            & (uni_sessions_df["date"].dt.date <= to_date)
         ]
 
     # Check if the DataFrame is empty after applying filters
@@ -639,7 +462,7 @@ def get_overall_sessions(uni_sessions_df, from_date: str, to_date: str):
         # Group the DataFrame by date and grade, and count the number of distinct learners (learner_id)
         session_groups = (
             uni_sessions_df.groupby(
-                [uni_sessions_df["updated_at"].dt.date, "school", "grade"],
+                ["date", "school", "grade"],
                 observed=True,
             )
             .agg(total_learners=("learner_id", "nunique"))
@@ -669,9 +492,9 @@ def get_overall_sessions(uni_sessions_df, from_date: str, to_date: str):
 
 # - This will provide the number of sessions conducted in that week.
 def get_sessions(from_date, to_date, school, grade, tenant):
-    sessions_data = get_all_learners_data_df()[
-        ["updated_at", "school", "grade", "tenant_name", "learner_id"]
-    ]
+    sessions_data = get_learner_day_rollup_df(
+        ["date", "school", "grade", "tenant_name", "learner_id"]
+    )
 
     # Filter learners of selected school
     if school:
@@ -690,16 +513,15 @@ def get_sessions(from_date, to_date, school, grade, tenant):
 
     # Filter learners records to include only those after the specified from_date
     if from_date:
-        sessions_data = sessions_data[sessions_data["updated_at"].dt.date >= from_date]
+        sessions_data = sessions_data[sessions_data["date"].dt.date >= from_date]
 
     # Filter learners records to include only those up to the specified to_date
     if to_date:
-        sessions_data = sessions_data[sessions_data["updated_at"].dt.date <= to_date]
+        sessions_data = sessions_data[sessions_data["date"].dt.date <= to_date]
 
     # Check if the DataFrame is not empty after applying filters
     if not sessions_data.empty:
-        # Extract date from updated_at column
-        sessions_data["updated_date"] = sessions_data["updated_at"].dt.date
+        sessions_data = sessions_data.rename(columns={"date": "updated_date"})
 
         # Get unique learners of respective grades on every date
         sessions_data = sessions_data.drop_duplicates(
@@ -707,9 +529,7 @@ def get_sessions(from_date, to_date, school, grade, tenant):
         )
 
         # Map week range to every entry based on date
-        sessions_data.loc[:, "week_range"] = sessions_data["updated_date"].apply(
-            lambda x: calculate_range(x)
-        )
+        sessions_data["week_range"] = get_week_ranges(sessions_data["updated_date"])
 
         # Count the number of unique learners of respective grades on every date
         grouped_session_data = (
@@ -788,36 +608,25 @@ def get_work_done(
     tenant: str,
     overall_unique_learners: pd.DataFrame,
 ):
-    work_done_data = get_all_learners_data_df()[
+    work_done_data = get_all_learners_data_df(
         [
             "updated_at",
+            "week_range",
             "school",
             "operation",
             "grade",
             "tenant_name",
             "learner_id",
             "attempts_count",
-        ]
-    ]
-
-    # Filter learners of selected school
-    if school:
-        work_done_data = work_done_data[work_done_data["school"] == school]
-
-    # Apply grade filter if 'grade' is provided
-    if grade:
-        # Filter the DataFrame to include only records of the specified 'grade'
-        work_done_data = work_done_data[work_done_data["grade"] == grade]
-
-    # Apply operation filter if 'operation' is provided
-    if operation:
-        # Filter the DataFrame to include only records of the specified 'operation'
-        work_done_data = work_done_data[work_done_data["operation"] == operation]
-
-    # Apply tenant filter if 'tenant' is provided
-    if tenant:
-        # Filter the DataFrame to include only records of the specified 'tenant'
-        work_done_data = work_done_data[work_done_data["tenant_name"] == tenant]
+        ],
+        *get_learners_data_date_range(from_date, to_date),
+        # The selected school, grade, operation and tenant are looked up in the
+        # filter index while loading the learners data
+        tenant=tenant,
+        school=school,
+        grade=grade,
+        operation=operation,
+    )
 
     # Fetch the overall work done based on the provided filters
     overall_work_done = get_overall_work_done(work_done_data.copy(), from_date, to_date)
@@ -839,11 +648,6 @@ def get_work_done(
         # Extract date from updated_at column
         work_done_data["updated_date"] = work_done_data["updated_at"].dt.date
 
-        # Map the week range to every entry based on the date
-        work_done_data.loc[:, "week_range"] = work_done_data["updated_date"].apply(
-            lambda x: calculate_range(x)
-        )
-
         # Rename the 'attempts_count' column to 'work done'
         work_done_data.rename(columns={"attempts_count": "work done"}, inplace=True)
 
@@ -915,10 +719,9 @@ def get_avg_work_done_per_learner(
     overall_work_done_avg = pd.DataFrame([{"overall_count": overall_work_done_per_lr}])
 
     # Count the number of unique learners who worked in each week range
-    # This is done by mapping the 'week_range' to the count of unique learners for each week range
-    work_done_per_learner_df["unique_learners"] = work_done_per_learner_df[
-        "week_range"
-    ].map(work_done_per_learner_df.groupby("week_range")["learner_id"].nunique())
+    work_done_per_learner_df["unique_learners"] = work_done_per_learner_df.groupby(
+        "week_range", observed=True
+    )["learner_id"].transform("nunique")
 
     # Check if the DataFrame is not empty after adding the 'unique_learners' column
     if not work_done_per_learner_df.empty:
@@ -1030,33 +833,16 @@ def get_overall_time_taken(time_taken_df, from_date: str, to_date: str):
     # Apply date filter if 'from_date' and 'to_date' are provided
     if from_date and to_date:
         time_taken_df = time_taken_df[
-            (time_taken_df["updated_at"].dt.date >= from_date)
-            & (time_taken_df["updated_at"].dt.date <= to_date)
+            (time_taken_df["date"].dt.date >= from_date)
+            & (time_taken_df["date"].dt.date <= to_date)
         ]
 
     # Check if DataFrame is empty after operation filter
     if time_taken_df.empty:
         total_time_taken = 0
     else:
-        # Group by learner_id and date, then calculate min and max times
-        time_taken_df["updated_at"] = pd.to_datetime(time_taken_df["updated_at"])
-        time_taken_df_grouped = (
-            time_taken_df.groupby(
-                ["learner_id", time_taken_df["updated_at"].dt.date], observed=True
-            )
-            .agg(min_time=("updated_at", "min"), max_time=("updated_at", "max"))
-            .reset_index()
-        )
-
-        # Calculate time difference in seconds
-        time_taken_df_grouped["time_diff"] = (
-            time_taken_df_grouped["max_time"] - time_taken_df_grouped["min_time"]
-        ).dt.total_seconds()
-
-        # Set maximum value of 'time_diff' to 45 minutes = 2700 seconds
-        time_taken_df_grouped["time_diff"] = time_taken_df_grouped["time_diff"].clip(
-            upper=2700
-        )
+        # Calculate the time spent by every learner on every date
+        time_taken_df_grouped = get_learner_day_time_spent(time_taken_df)
 
         # Sum up the time difference and convert to minutes
         total_time_taken = round(time_taken_df_grouped["time_diff"].sum() / 60, 2)
@@ -1083,16 +869,18 @@ def get_total_time_taken(
     within a specified date range, grade, and operation. It also provides a weekly
     breakdown of the total time taken.
     """
-    time_taken_data = get_all_learners_data_df()[
+    time_taken_data = get_learner_day_rollup_df(
         [
-            "updated_at",
+            "date",
             "school",
             "operation",
             "grade",
             "tenant_name",
             "learner_id",
+            "first_updated_at",
+            "last_updated_at",
         ]
-    ]
+    )
 
     # Filter learners of selected school
     if school:
@@ -1117,41 +905,21 @@ def get_total_time_taken(
 
     # Apply date filter if 'from_date' is provided
     if from_date:
-        time_taken_data = time_taken_data[
-            time_taken_data["updated_at"].dt.date >= from_date
-        ]
+        time_taken_data = time_taken_data[time_taken_data["date"].dt.date >= from_date]
 
     # Apply date filter if 'to_date' is provided
     if to_date:
-        time_taken_data = time_taken_data[
-            time_taken_data["updated_at"].dt.date <= to_date
-        ]
+        time_taken_data = time_taken_data[time_taken_data["date"].dt.date <= to_date]
 
     if not time_taken_data.empty:
-        # Extract date from 'updated_at' column
-        time_taken_data["updated_date"] = time_taken_data["updated_at"].dt.date
-
-        # Calculate max and min timestamp of learners on every date
-        time_taken_data = (
-            time_taken_data.groupby(["updated_date", "learner_id"], observed=True)
-            .agg(
-                min_time=("updated_at", lambda x: x.loc[x.idxmin()]),
-                max_time=("updated_at", lambda x: x.loc[x.idxmax()]),
-            )
-            .reset_index()
+        # Calculate the time spent by every learner on every date
+        time_taken_data = get_learner_day_time_spent(time_taken_data).rename(
+            columns={"date": "updated_date"}
         )
 
-        # Calculate total time in seconds by subtracting max and min time
-        time_taken_data["time_diff"] = (
-            time_taken_data["max_time"] - time_taken_data["min_time"]
-        ).dt.total_seconds()
-
-        # Set maximum value of 'time_diff' to 45 minutes = 2700 seconds
-        time_taken_data["time_diff"] = time_taken_data["time_diff"].clip(upper=2700)
-
         # Map week range to every entry based on date
-        time_taken_data.loc[:, "week_range"] = time_taken_data["updated_date"].apply(
-            lambda x: calculate_range(x)
+        time_taken_data["week_range"] = get_week_ranges(
+            time_taken_data["updated_date"]
         )
 
         # Create pivot table for weekly representation of total time taken
@@ -1208,10 +976,9 @@ def avg_time_taken_per_learner(
     )
 
     # Count the number of unique learners who worked in each week range
-    # This is done by mapping the 'week_range' to the count of unique learners for each week range
-    time_taken_per_learner_df["unique_learners"] = time_taken_per_learner_df[
-        "week_range"
-    ].map(time_taken_per_learner_df.groupby("week_range")["learner_id"].nunique())
+    time_taken_per_learner_df["unique_learners"] = time_taken_per_learner_df.groupby(
+        "week_range", observed=True
+    )["learner_id"].transform("nunique")
 
     # Check if the DataFrame is not empty after adding the 'unique_learners' column
     if not time_taken_per_learner_df.empty:
@@ -1299,44 +1066,25 @@ def get_overall_median_accuracy(accuracy_df, from_date: str, to_date: str):
 
 # - At week wise level, It represents the median of accuracies of all learners on the data attempted in that week.
 def get_median_accuracy(from_date, to_date, school, grade, operation, tenant):
-    learners_accuracy_data = get_all_learners_data_df()[
+    learners_accuracy_data = get_all_learners_data_df(
         [
             "updated_at",
+            "week_range",
             "school",
             "operation",
             "grade",
             "tenant_name",
             "learner_id",
             "score",
-        ]
-    ]
-
-    # Filter learners of selected school
-    if school:
-        learners_accuracy_data = learners_accuracy_data[
-            learners_accuracy_data["school"] == school
-        ]
-
-    # Apply grade filter if 'grade' is provided
-    if grade:
-        # Filter the DataFrame to include only records of the specified 'grade'
-        learners_accuracy_data = learners_accuracy_data[
-            learners_accuracy_data["grade"] == grade
-        ]
-
-    # Apply operation filter if 'operation' is provided
-    if operation:
-        # Filter the DataFrame to include only records of the specified 'operation'
-        learners_accuracy_data = learners_accuracy_data[
-            learners_accuracy_data["operation"] == operation
-        ]
-
-    # Apply tenant filter if 'tenant' is provided
-    if tenant:
-        # Filter the DataFrame to include only records of the specified 'tenant'
-        learners_accuracy_data = learners_accuracy_data[
-            learners_accuracy_data["tenant_name"] == tenant
-        ]
+        ],
+        *get_learners_data_date_range(from_date, to_date),
+        # The selected school, grade, operation and tenant are looked up in the
+        # filter index while loading the learners data
+        tenant=tenant,
+        school=school,
+        grade=grade,
+        operation=operation,
+    )
 
     # Fetch the overall median accuracy of learners
     overall_median_accuracy = get_overall_median_accuracy(
@@ -1364,11 +1112,6 @@ def get_median_accuracy(from_date, to_date, school, grade, operation, tenant):
             "updated_at"
         ].dt.date
 
-        # Map week range to every entry based on date
-        learners_accuracy_data.loc[:, "week_range"] = learners_accuracy_data[
-            "updated_date"
-        ].apply(lambda x: calculate_range(x))
-
         # Calculate the accuracy of every learner in respective weeks
         weekly_accuracy_per_learner = (
             learners_accuracy_data.groupby(["week_range", "learner_id"], observed=True)
@@ -1574,9 +1317,9 @@ def get_median_time_for_grade_jump(
 
     if not final_overall_grad_jump_dt.empty:
         # Calculate the week range for each timestamp
-        final_overall_grad_jump_dt.loc[:, "week_range"] = final_overall_grad_jump_dt[
-            "min_timestamp"
-        ].dt.date.apply(lambda x: calculate_range(x))
+        final_overall_grad_jump_dt["week_range"] = get_week_ranges(
+            final_overall_grad_jump_dt["min_timestamp"]
+        )
 
         # Create a pivot table for the weekly representation of median time-taken for grade jump
         weekly_median_time = (
@@ -1851,9 +1594,9 @@ def get_median_time_for_operation_jump(from_date, to_date, school, grade, tenant
         ]
 
     if not overall_operator_jump_df.empty:
-        overall_operator_jump_df.loc[:, "week_range"] = overall_operator_jump_df[
-            "min_timestamp"
-        ].dt.date.apply(lambda x: calculate_range(x))
+        overall_operator_jump_df["week_range"] = get_week_ranges(
+            overall_operator_jump_df["min_timestamp"]
+        )
 
         # Create pivot table for weekly representation of median time-taken for operation jump
         weekly_median_time = (
@@ -1966,6 +1709,358 @@ def get_median_time_for_operation_jump(from_date, to_date, school, grade, tenant
     return overall_median_operator_jump_time, weekly_operator_jump_median_time
 
 
+""" WEEKLY METRIC CUBE AND LEARNER SETS """
+# Work done and work done per learner are answered from a cube of weekly aggregates per tenant, school, grade and operation.
+# The cube only holds whole weeks, so it is used for date ranges starting on a Monday and ending on a Sunday or open.
+# Unique learners and new learners added are counted exactly from daily learner bitmaps for any date range,
+# or estimated from daily HyperLogLog sketches in the "hll" distinct learners mode.
+# Medians are not additive and are still calculated from the learners data.
+
+
+def is_week_aligned_range(from_date, to_date):
+    return (not from_date or from_date.weekday() == 0) and (
+        not to_date or to_date.weekday() == 6
+    )
+
+
+def filter_metric_dimensions(metric_data, school, grade, operation, tenant):
+    # Apply the selected filters on the dimensions of a cube or sketch table
+    for column, value in [
+        ("school", school),
+        ("grade", grade),
+        ("operation", operation),
+        ("tenant_name", tenant),
+    ]:
+        if value:
+            metric_data = metric_data[metric_data[column] == value]
+    return metric_data
+
+
+def filter_metric_dates(metric_data, from_date, to_date, date_column="week_start"):
+    if from_date:
+        metric_data = metric_data[metric_data[date_column] >= pd.Timestamp(from_date)]
+    if to_date:
+        metric_data = metric_data[metric_data[date_column] <= pd.Timestamp(to_date)]
+    return metric_data
+
+
+# Learners of a set missing from another one, counted from the size of their union
+# for sets that cannot be subtracted, like HyperLogLog sketches
+def count_new_learners_by_union(count_set, merge_sets, learners, previous_learners):
+    return max(
+        count_set(merge_sets([learners, previous_learners]))
+        - count_set(previous_learners),
+        0,
+    )
+
+
+# Q: What are overall unique learners?
+# - All the learners who have attempted/solved even a single question on digital app are overall unique learners
+# - There are sub-divisions of unique learners based on operation - 'Addition', 'Subtraction', 'Multiplication', 'Division'
+# - These subdivisions tell that how many unique learners have attempted questions of these operations till now
+# - Weekly unique learners are the number of learners who solved/attempted even a single question in that week
+
+# Q: What are new learners added?
+# - The number of learners who have started attempting questions on digital app from that week.
+# - That's why this data is based on weeks. It simply calculates the learners record found till that week.
+# - It signifies learners who were already enrolled.
+# - And, Subtract those learners from learners having records in that week. This will provide the new learners if added that week.
+
+# Unique learner metrics from rows of learner sets per date and dimension.
+# The sets are combined with `merge_sets` and counted with `count_set`, so exact
+# learner bitmaps and HyperLogLog sketches share this logic. `count_new_learners`
+# counts the learners of a set missing from another one.
+def get_unique_learners_from_sets(
+    learner_sets,
+    from_date,
+    to_date,
+    school,
+    grade,
+    operation,
+    merge_sets,
+    count_set,
+    count_new_learners,
+    metric_suffix="",
+):
+    # Learners active before from_date, of any school, grade and operation
+    previous_learners = merge_sets(
+        learner_sets[learner_sets["date"] < pd.Timestamp(from_date)]["learners"]
+    )
+
+    learner_sets = filter_metric_dimensions(
+        learner_sets, school, grade, operation, None
+    )
+    operators_ls = ["Addition", "Subtraction", "Multiplication", "Division"]
+
+    # Overall unique learners and operation wise unique learners
+    overall_sets = (
+        filter_metric_dates(learner_sets, from_date, to_date, "date")
+        if from_date and to_date
+        else learner_sets
+    )
+    overall_count_df = pd.DataFrame(
+        [{"overall_count": count_set(merge_sets(overall_sets["learners"]))}]
+    )
+    op_wise_uni_learners_df = (
+        overall_sets.groupby("operation", observed=True)["learners"]
+        .agg(lambda op_sets: count_set(merge_sets(op_sets)))
+        .reset_index(name="overall_count")
+        .astype({"overall_count": "int64"})
+        .set_index("operation")
+        .reindex(operators_ls, fill_value=pd.NA)
+        .reset_index(drop=True)
+    )
+    overall_unique_learners = pd.concat(
+        [overall_count_df, op_wise_uni_learners_df]
+    ).reset_index(drop=True)
+
+    # Unique learners of every week, in total and for every operation
+    learner_sets = filter_metric_dates(learner_sets, from_date, to_date, "date").copy()
+    learner_sets["week_range"] = get_week_ranges(learner_sets["date"])
+    op_wise_weekly_learners = learner_sets.groupby(
+        ["week_range", "operation"], observed=True, dropna=False
+    )["learners"].agg(merge_sets)
+    weekly_learners = op_wise_weekly_learners.groupby(
+        level="week_range", observed=True
+    ).agg(merge_sets)
+
+    if not weekly_learners.empty:
+        weekly_uni_lrs_cnt_table = pd.pivot_table(
+            weekly_learners.map(count_set).reset_index(name="active_learners"),
+            columns="week_range",
+            values="active_learners",
+            aggfunc="sum",
+            observed=True,
+        ).reset_index(names=["metrics"])
+        weekly_uni_lrs_cnt_table.loc[0, "metrics"] = "active learners" + metric_suffix
+
+        op_wise_weekly_uni_lrs_cnt_table = (
+            pd.pivot_table(
+                op_wise_weekly_learners.map(count_set).reset_index(
+                    name="active_learners"
+                ),
+                index="operation",
+                columns="week_range",
+                values="active_learners",
+                aggfunc="sum",
+                observed=True,
+            )
+            .reindex(operators_ls, fill_value=pd.NA)
+            .reset_index()
+            .rename(columns={"operation": "sub_metrics"})
+        )
+    else:
+        weekly_uni_lrs_cnt_table = pd.DataFrame(
+            {"metrics": ["active learners" + metric_suffix]}
+        )
+        op_wise_weekly_uni_lrs_cnt_table = pd.DataFrame({"sub_metrics": operators_ls})
+
+    weekly_uni_lrs_cnt_table = pd.concat(
+        [weekly_uni_lrs_cnt_table, op_wise_weekly_uni_lrs_cnt_table]
+    )
+
+    # New learners of every week are its learners not seen in any earlier week,
+    # counted once for every operation they attempted
+    new_learners_added = []
+    for week_range, learners in weekly_learners.items():
+        new_learners_added.append(
+            {
+                "week_range": week_range,
+                "new learners added": sum(
+                    count_new_learners(op_learners, previous_learners)
+                    for op_learners in op_wise_weekly_learners[week_range]
+                ),
+            }
+        )
+        previous_learners = merge_sets([previous_learners, learners])
+    weekly_new_learners_added = pd.pivot_table(
+        pd.DataFrame(new_learners_added, columns=["week_range", "new learners added"]),
+        values="new learners added",
+        columns="week_range",
+        observed=True,
+    ).reset_index(names=["metrics"])
+    if metric_suffix and not weekly_new_learners_added.empty:
+        weekly_new_learners_added.loc[0, "metrics"] += metric_suffix
+
+    return (
+        overall_unique_learners,
+        weekly_uni_lrs_cnt_table,
+        weekly_new_learners_added,
+        weekly_learners.map(count_set),
+    )
+
+
+def get_unique_learners_from_bitmaps(
+    from_date, to_date, school, grade, operation, tenant
+):
+    daily_bitmaps = filter_metric_dimensions(
+        get_learners_daily_bitmaps_df(), None, None, None, tenant
+    )
+    # Bitmaps have a bit for every learner code in use
+    learner_codes = np.concatenate(
+        [np.array([-1], dtype="int32"), *daily_bitmaps["learners"]]
+    )
+    bitmap_size = int(learner_codes.max()) + 1
+    return get_unique_learners_from_sets(
+        daily_bitmaps,
+        from_date,
+        to_date,
+        school,
+        grade,
+        operation,
+        lambda learner_sets: merge_bitmaps(learner_sets, bitmap_size),
+        count_bitmap,
+        # New learners are the learners of the week AND NOT those seen before it
+        lambda learners, previous_learners: count_bitmap(
+            subtract_bitmap(learners, previous_learners)
+        ),
+    )
+
+
+# In the "hll" distinct learners mode, unique learners are estimated by merging daily HyperLogLog sketches
+# instead of bitmaps, which answers any date range and filters. Small sets of learners are still counted exactly.
+def get_unique_learners_from_sketches(
+    from_date, to_date, school, grade, operation, tenant
+):
+    daily_sketch = filter_metric_dimensions(
+        get_learners_daily_sketch_df(), None, None, None, tenant
+    )
+    daily_sketch = daily_sketch.assign(
+        learners=list(zip(daily_sketch["learners"], daily_sketch["registers"]))
+    )
+    return get_unique_learners_from_sets(
+        daily_sketch,
+        from_date,
+        to_date,
+        school,
+        grade,
+        operation,
+        merge_sketches,
+        estimate_distinct,
+        partial(count_new_learners_by_union, estimate_distinct, merge_sketches),
+        # Report the standard error of the estimates along with them
+        metric_suffix=f" (approx. ±{standard_error():.1%})",
+    )
+
+
+def get_work_done_from_cube(
+    from_date,
+    to_date,
+    school,
+    grade,
+    operation,
+    tenant,
+    overall_unique_learners,
+    weekly_unique_learners,
+):
+    weekly_cube = filter_metric_dimensions(
+        get_learners_weekly_cube_df(), school, grade, operation, tenant
+    )
+
+    # Overall work done is the number of questions in the whole date range
+    overall_cube = (
+        filter_metric_dates(weekly_cube, from_date, to_date)
+        if from_date and to_date
+        else weekly_cube
+    )
+    overall_work_done = pd.DataFrame(
+        [{"overall_count": int(overall_cube["questions"].sum())}]
+    )
+
+    # Average work done per learner at the overall level
+    overall_learners_count = overall_unique_learners.loc[0, "overall_count"]
+    if pd.isna(overall_learners_count) or overall_learners_count == 0:
+        overall_work_done_per_lr = 0
+    else:
+        overall_work_done_per_lr = (
+            overall_work_done.loc[0, "overall_count"] // overall_learners_count
+        )
+    overall_work_done_avg = pd.DataFrame([{"overall_count": overall_work_done_per_lr}])
+
+    weekly_cube = filter_metric_dates(weekly_cube, from_date, to_date).copy()
+    if not weekly_cube.empty:
+        weekly_cube["week_range"] = get_week_ranges(weekly_cube["week_start"])
+        weekly_questions = weekly_cube.groupby("week_range", observed=True)[
+            "questions"
+        ].sum()
+
+        weekly_work_done = pd.pivot_table(
+            weekly_questions.reset_index(name="work done"),
+            values="work done",
+            columns="week_range",
+            aggfunc="sum",
+            observed=True,
+        ).reset_index(names=["metrics"])
+
+        # Average work done per learner in every week
+        weekly_work_done_per_lr = (
+            (weekly_questions // weekly_unique_learners[weekly_questions.index])
+            .to_frame(name="work done per learner")
+            .transpose()
+            .reset_index(names=["metrics"])
+        )
+    else:
+        weekly_work_done = pd.DataFrame({"metrics": ["work done"]})
+        weekly_work_done_per_lr = pd.DataFrame({"metrics": ["work done per learner"]})
+
+    return (
+        overall_work_done,
+        weekly_work_done,
+        overall_work_done_avg,
+        weekly_work_done_per_lr,
+    )
+
+
+# Median work done per learner is not additive, so it is calculated from the learners data
+def get_median_work_done(from_date, to_date, school, grade, operation, tenant):
+    # The selected filters are applied while loading the learners data
+    work_done_data = get_learners_columns(
+        ["week_range", "learner_id", "attempts_count"],
+        from_date,
+        to_date,
+        tenant=tenant,
+        school=school,
+        grade=grade,
+        operation=operation,
+    )
+
+    if work_done_data.empty:
+        work_done_data = pd.DataFrame(columns=["work done", "learner_id", "week_range"])
+    return get_median_work_done_per_learner(
+        work_done_data.rename(columns={"attempts_count": "work done"})
+    )
+
+
+# Thread pool the metric families of the master table are computed on
+metrics_executor = (
+    ThreadPoolExecutor(max_workers=config.METRICS_WORKERS, thread_name_prefix="metrics")
+    if config.METRICS_WORKERS > 1
+    else None
+)
+
+
+def time_metric_family(name, compute, *args):
+    """Compute a metric family, logging how long it took."""
+    started_at = time.perf_counter()
+    result = compute(*args)
+    print(f"Computed {name} metrics in {time.perf_counter() - started_at:.2f}s")
+    return result
+
+
+def submit_metric_family(name, compute, *args):
+    """Start computing a metric family, returning a future of its result.
+
+    With more than one `METRICS_WORKERS` families run concurrently on the
+    metrics thread pool, sharing the cached frames without copying them.
+    Otherwise they are computed right away in the calling thread.
+    """
+    if metrics_executor is None:
+        future = Future()
+        future.set_result(time_metric_family(name, compute, *args))
+        return future
+    return metrics_executor.submit(time_metric_family, name, compute, *args)
+
+
 def get_learners_metrics_data(
     from_date: str,
     to_date: str,
@@ -1987,72 +2082,180 @@ def get_learners_metrics_data(
     - final_table_df (DataFrame): A DataFrame containing the calculated metrics.
     """
 
+    # Additive metrics are rolled up from the weekly metric cube for whole weeks
+    use_weekly_cube = is_week_aligned_range(from_date, to_date)
+
+    # Metric families are started right away and only waited for when their
+    # results are needed, so they run concurrently on the metrics thread pool
+
     """ UNIQUE LEARNERS LOGIC AND NEW LEARNERS ADDED LOGIC """
     # Calculate unique learners, weekly unique learners count, and final unique learners DataFrame
-    overall_unique_learners, weekly_uni_lrs_cnt_table, weekly_new_learners_added = (
-        get_unique_learners(from_date, to_date, school, grade, operation, tenant)
+    unique_learners = submit_metric_family(
+        "unique learners",
+        (
+            get_unique_learners_from_sketches
+            if config.DISTINCT_LEARNERS_MODE == "hll"
+            else get_unique_learners_from_bitmaps
+        ),
+        from_date,
+        to_date,
+        school,
+        grade,
+        operation,
+        tenant,
     )
 
     """ LOGGED IN USERS LOGIC """
     # Calculate logged in users, weekly logged in users count, and logged in users DataFrame
-    overall_logged_in_users, weekly_logged_in_users_cnt_table = get_logged_in_users(
-        from_date, to_date, school, grade, tenant
+    logged_in_users = submit_metric_family(
+        "logged in users",
+        get_logged_in_users,
+        from_date,
+        to_date,
+        school,
+        grade,
+        tenant,
     )
 
     """ SESSIONS COUNT LOGIC"""
     # Calculate overall sessions and weekly sessions count
-    overall_sessions, weekly_sessions_cnt_table = get_sessions(
-        from_date, to_date, school, grade, tenant
-    )
-
-    """ WORK DONE LOGIC & WORK DONE PER LEARNER LOGIC & MEDIAN WORK DONE PER LEARNER LOGIC"""
-    # Calculate overall work done and weekly work done
-    # Calculate average work done per learner and weekly work done per learner
-    # Calculate median work done per learner
-    (
-        overall_work_done,
-        weekly_work_done,
-        overall_work_done_avg,
-        weekly_work_done_per_lr,
-        overall_median_work_done,
-        weekly_median_work_done,
-    ) = get_work_done(
-        from_date, to_date, school, grade, operation, tenant, overall_unique_learners
-    )
-
-    """ TOTAL TIME TAKEN LOGIC & AVERAGE TIME PER LEARNER LOGIC"""
-    # Calculate overall time taken, weekly total time, and total time DataFrame
-    # Calculate average time taken per learner and weekly time taken per learner
-    (
-        overall_time_taken,
-        weekly_total_time,
-        overall_time_taken_avg,
-        weekly_time_taken_per_lr,
-    ) = get_total_time_taken(
-        from_date, to_date, school, grade, operation, tenant, overall_unique_learners
+    sessions = submit_metric_family(
+        "sessions", get_sessions, from_date, to_date, school, grade, tenant
     )
 
     """MEDIAN ACCURACY OF LEARNERS LOGIC"""
-
     # Calculate median accuracy of learners
-    overall_median_accuracy, weekly_median_accuracy = get_median_accuracy(
-        from_date, to_date, school, grade, operation, tenant
+    median_accuracy = submit_metric_family(
+        "median accuracy",
+        get_median_accuracy,
+        from_date,
+        to_date,
+        school,
+        grade,
+        operation,
+        tenant,
     )
 
     """ MEDIAN TIME TAKEN FOR GRADE JUMP """
-
     # Calculate median time taken for grade jump
-    overall_median_grade_jump_time, weekly_grade_jump_median_time = (
-        get_median_time_for_grade_jump(
-            from_date, to_date, school, grade, operation, tenant
-        )
+    grade_jump = submit_metric_family(
+        "grade jump",
+        get_median_time_for_grade_jump,
+        from_date,
+        to_date,
+        school,
+        grade,
+        operation,
+        tenant,
     )
 
     """ MEDIAN TIME TAKEN FOR OPERATOR JUMP"""
     # Calculate median time taken for operator jump
+    operator_jump = submit_metric_family(
+        "operator jump",
+        get_median_time_for_operation_jump,
+        from_date,
+        to_date,
+        school,
+        grade,
+        tenant,
+    )
+
+    """ WORK DONE LOGIC & WORK DONE PER LEARNER LOGIC & MEDIAN WORK DONE PER LEARNER LOGIC"""
+    # Calculate median work done per learner
+    if use_weekly_cube:
+        median_work_done = submit_metric_family(
+            "median work done",
+            get_median_work_done,
+            from_date,
+            to_date,
+            school,
+            grade,
+            operation,
+            tenant,
+        )
+
+    # Work done and time taken per learner need the unique learners
+    (
+        overall_unique_learners,
+        weekly_uni_lrs_cnt_table,
+        weekly_new_learners_added,
+        weekly_unique_learners,
+    ) = unique_learners.result()
+
+    # Calculate overall work done and weekly work done
+    # Calculate average work done per learner and weekly work done per learner
+    if use_weekly_cube:
+        work_done = submit_metric_family(
+            "work done",
+            get_work_done_from_cube,
+            from_date,
+            to_date,
+            school,
+            grade,
+            operation,
+            tenant,
+            overall_unique_learners,
+            weekly_unique_learners,
+        )
+    else:
+        work_done = submit_metric_family(
+            "work done",
+            get_work_done,
+            from_date,
+            to_date,
+            school,
+            grade,
+            operation,
+            tenant,
+            overall_unique_learners,
+        )
+
+    """ TOTAL TIME TAKEN LOGIC & AVERAGE TIME PER LEARNER LOGIC"""
+    # Calculate overall time taken, weekly total time, and total time DataFrame
+    # Calculate average time taken per learner and weekly time taken per learner
+    time_taken = submit_metric_family(
+        "time taken",
+        get_total_time_taken,
+        from_date,
+        to_date,
+        school,
+        grade,
+        operation,
+        tenant,
+        overall_unique_learners,
+    )
+
+    overall_logged_in_users, weekly_logged_in_users_cnt_table = logged_in_users.result()
+    overall_sessions, weekly_sessions_cnt_table = sessions.result()
+    overall_median_accuracy, weekly_median_accuracy = median_accuracy.result()
+    overall_median_grade_jump_time, weekly_grade_jump_median_time = grade_jump.result()
     overall_median_operator_jump_time, weekly_operator_jump_median_time = (
-        get_median_time_for_operation_jump(from_date, to_date, school, grade, tenant)
+        operator_jump.result()
     )
+    if use_weekly_cube:
+        (
+            overall_work_done,
+            weekly_work_done,
+            overall_work_done_avg,
+            weekly_work_done_per_lr,
+        ) = work_done.result()
+        overall_median_work_done, weekly_median_work_done = median_work_done.result()
+    else:
+        (
+            overall_work_done,
+            weekly_work_done,
+            overall_work_done_avg,
+            weekly_work_done_per_lr,
+            overall_median_work_done,
+            weekly_median_work_done,
+        ) = work_done.result()
+    (
+        overall_time_taken,
+        weekly_total_time,
+        overall_time_taken_avg,
+        weekly_time_taken_per_lr,
+    ) = time_taken.result()
 
     # Calculate final table data
     overall_count_df = pd.concat(
@@ -2166,18 +2369,32 @@ def update_table(
         start_date = pd.to_datetime(start_date).date()
         end_date = pd.to_datetime(end_date).date()
 
-    # Filter the DataFrame based on the selected schools, school_grades and learner_id
-    filtered_data = get_learners_metrics_data(
-        start_date,
-        end_date,
-        selected_school,
-        selected_grade,
-        selected_operation,
-        selected_tenant,
+    # Most users open the same views, so the table is memoized per data version
+    # and reference data checksums, which cover the logged in users
+    filtered_data, week_columns = get_memoized_result(
+        "learners_metrics",
+        [
+            start_date,
+            end_date,
+            selected_school,
+            selected_grade,
+            selected_operation,
+            selected_tenant,
+        ],
+        lambda: (
+            get_learners_metrics_data(
+                start_date,
+                end_date,
+                selected_school,
+                selected_grade,
+                selected_operation,
+                selected_tenant,
+            ),
+            # Generate week ranges based on the selected date range
+            generate_week_ranges(start_date, end_date),
+        ),
     )
 
-    # Generate week ranges based on the selected date range
-    week_columns = generate_week_ranges(start_date, end_date)
     # Define non-week columns for the table
     non_week_columns = [
         {"name": col.replace("_", " ").title(), "id": col}
@@ -2325,7 +2542,7 @@ def update_learners_list_table(
             if selected_operation:
                 operation = selected_operation
 
-            all_learners_data = get_all_learners_data_df()[
+            all_learners_data = get_all_learners_data_df(
                 [
                     "updated_at",
                     "school",
@@ -2339,13 +2556,16 @@ def update_learners_list_table(
                     "score",
                     "qset_grade",
                     "purpose",
-                ]
-            ]
-
-            # Filter the learners attempts data based on the operation
-            learners_attempts_data = all_learners_data[
-                all_learners_data["operation"] == operation
-            ]
+                ],
+                # The operation, tenant, school, grade and qset type filters are
+                # looked up in the filter index while loading the learners data
+                tenant=parent_tenant,
+                school=selected_school or parent_school,
+                grade=selected_grade or parent_grade,
+                operation=operation,
+                purpose=qset_types,
+            )
+            learners_attempts_data = all_learners_data
 
             # If no operation is selected and a parent operation is present, filter the data based on the parent operation
             if not selected_operation and parent_operation:
@@ -2372,38 +2592,6 @@ def update_learners_list_table(
                     learners_attempts_data["updated_at"].dt.date <= to_date_dt
                 ]
 
-            # Apply tenant filters if the tenant is selected
-            if parent_tenant:
-                learners_attempts_data = learners_attempts_data[
-                    learners_attempts_data["tenant_name"] == parent_tenant
-                ]
-
-            # Apply school filters if the school is selected
-            if selected_school:
-                learners_attempts_data = learners_attempts_data[
-                    learners_attempts_data["school"] == selected_school
-                ]
-            elif parent_school:
-                learners_attempts_data = learners_attempts_data[
-                    learners_attempts_data["school"] == parent_school
-                ]
-
-            # Apply grade filters if the grade is selected
-            if selected_grade:
-                learners_attempts_data = learners_attempts_data[
-                    learners_attempts_data["grade"] == selected_grade
-                ]
-            elif parent_grade:
-                learners_attempts_data = learners_attempts_data[
-                    learners_attempts_data["grade"] == parent_grade
-                ]
-
-            # Apply qset type filters if the qset types are selected
-            if qset_types:
-                learners_attempts_data = learners_attempts_data[
-                    learners_attempts_data["purpose"].isin(qset_types)
-                ]
-
             # Generate the selected time frame and operation
             selected_time_frame = (
                 f"Time Frame: {from_date} - {to_date if to_date else 'present'}"
@@ -2485,6 +2673,14 @@ def update_learners_list_table(
                         learner_username_mapping
                     )
                 )
+
+                # Show the learner ids instead of their codes, ordered by id
+                learners_attempt_table_data["learner_id"] = get_ids(
+                    "learner_id", learners_attempt_table_data["learner_id"]
+                )
+                learners_attempt_table_data = learners_attempt_table_data.sort_values(
+                    "learner_id", ignore_index=True
+                )
     # Return the learners attempt table data, hidden flag, and selected filters
     return learners_attempt_table_data.to_dict("records"), hidden, selected_filters
 
@@ -2533,7 +2729,7 @@ def update_learner_info_table(
         if column == "learner_id":
             hidden = False
             learner_id = data[active_cell["row"]]["learner_id"]
-            selected_learner_data = get_all_learners_data_df()[
+            selected_learner_data = get_all_learners_data_df(
                 [
                     "updated_at",
                     "learner_id",
@@ -2547,10 +2743,11 @@ def update_learner_info_table(
                     "attempts_count",
                     "score",
                 ]
-            ]
+            )
             if not learner_uni_name:
                 selected_learner_data = selected_learner_data[
-                    selected_learner_data["learner_id"] == learner_id
+                    selected_learner_data["learner_id"]
+                    == get_id_codes("learner_id", [learner_id])[0]
                 ].copy()
             else:
                 learner_username, learner_name = learner_uni_name.split("-")
@@ -2578,6 +2775,14 @@ def update_learner_info_table(
             # Check if the selected learner data is not empty
             if not selected_learner_data.empty:
                 question_sequence_data = get_question_sequence_data_df()
+                question_sequence_data = question_sequence_data.assign(
+                    question_id=get_id_codes(
+                        "question_id", question_sequence_data["question_id"]
+                    ),
+                    question_set_id=get_id_codes(
+                        "question_set_id", question_sequence_data["question_set_id"]
+                    ),
+                )
                 selected_learner_data = selected_learner_data.merge(
                     question_sequence_data,
                     how="left",
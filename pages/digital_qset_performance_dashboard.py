@@ -4,11 +4,11 @@ import pandas as pd
 from dash import Dash, Input, Output, callback, dash_table, dcc, html
 
 from db_utils import (
-    get_all_learners_data_df,
     get_all_question_sets,
     get_grades_list,
     get_l2_skills_list,
     get_l3_skills_list,
+    get_learners_qset_performance_df,
     get_qset_types_list,
     get_repository_names_list,
 )
@@ -57,59 +57,22 @@ def get_question_set_data(
     selected_l3_skill,
     selected_sheet_type,
 ):
-    all_learners_data = get_all_learners_data_df()[
-        [
-            "repo_name",
-            "question_set_id",
-            "qset_uid",
-            "learner_id",
-            "operation",
-            "qset_grade",
-            "sequence",
-            "purpose",
-            "qset_name",
-            "l1_skill",
-            "l2_skill",
-            "l3_skill",
-            "updated_at",
-            "score",
-            "status",
-        ]
-    ]
-    completed_question_sets_data = all_learners_data[
-        all_learners_data["status"] == "completed"
-    ]
-
-    # Add conditions based on selected filters
-    if selected_repo:
-        completed_question_sets_data = completed_question_sets_data[
-            completed_question_sets_data["repo_name"] == selected_repo
-        ]
-
-    if selected_qsets:
-        completed_question_sets_data = completed_question_sets_data[
-            completed_question_sets_data["qset_uid"].isin(selected_qsets)
-        ]
-
-    if selected_operation:
-        completed_question_sets_data = completed_question_sets_data[
-            completed_question_sets_data["l1_skill"] == selected_operation
-        ]
-
-    if selected_l2_skill:
-        completed_question_sets_data = completed_question_sets_data[
-            completed_question_sets_data["l2_skill"] == selected_l2_skill
-        ]
-
-    if selected_l3_skill:
-        completed_question_sets_data = completed_question_sets_data[
-            completed_question_sets_data["l3_skill"] == selected_l3_skill
-        ]
-
-    if selected_sheet_type:
-        completed_question_sets_data = completed_question_sets_data[
-            completed_question_sets_data["purpose"] == selected_sheet_type
+    # Totals of the completed question sets of every learner, aggregated at ingest.
+    # The selected filters are resolved through the filter index of these totals,
+    # so only the matching rows are gathered
+    filters = {
+        column: value
+        for column, value in [
+            ("repo_name", selected_repo),
+            ("qset_uid", selected_qsets),
+            ("l1_skill", selected_operation),
+            ("l2_skill", selected_l2_skill),
+            ("l3_skill", selected_l3_skill),
+            ("purpose", selected_sheet_type),
         ]
+        if value
+    }
+    completed_question_sets_data = get_learners_qset_performance_df(filters=filters)
 
     return completed_question_sets_data
 
@@ -193,65 +156,8 @@ def update_table(
     if question_set_data.empty:
         return pd.DataFrame([]).to_dict("records")
 
-    question_set_data["updated_date"] = question_set_data["updated_at"].dt.date
-
-    # Group data by learner and calculate time spent on and marks scored in respective qsets on each date
-    question_set_data_per_learner = (
-        question_set_data.groupby(
-            [
-                "question_set_id",
-                "qset_uid",
-                "learner_id",
-                "operation",
-                "qset_grade",
-                "sequence",
-                "purpose",
-                "qset_name",
-                "l2_skill",
-                "l3_skill",
-                "updated_date",
-            ],
-            observed=True,
-        )
-        .agg(
-            min_timestamp=("updated_at", "min"),
-            max_timestamp=("updated_at", "max"),
-            score=("score", "sum"),
-            count=("score", "count"),
-        )
-        .reset_index()
-    )
-
-    # Calculate time difference in seconds
-    question_set_data_per_learner["time_diff"] = (
-        question_set_data_per_learner["max_timestamp"]
-        - question_set_data_per_learner["min_timestamp"]
-    ).dt.total_seconds()
-
-    # Aggregate total time taken, total marks scored and total questions attempted of every qset attempted by learners
-    final_question_set_data_per_learner = (
-        question_set_data_per_learner.groupby(
-            [
-                "question_set_id",
-                "qset_uid",
-                "learner_id",
-                "operation",
-                "qset_grade",
-                "sequence",
-                "purpose",
-                "qset_name",
-                "l2_skill",
-                "l3_skill",
-            ],
-            observed=True,
-        )
-        .agg(
-            total_time=("time_diff", "sum"),
-            total_score=("score", "sum"),
-            total_count=("count", "sum"),
-        )
-        .reset_index()
-    )
+    # Total time taken, total marks scored and total questions attempted of every qset attempted by learners
+    final_question_set_data_per_learner = question_set_data.copy()
 
     # Calculate accuracy of every qset attempted by each learner
     final_question_set_data_per_learner["accuracy"] = (
@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+import config
+
+# Memoized dashboard results of this process, as serialized blobs by key.
+#
+# Results are only valid for the learners data version they were computed
+# from, so the whole cache is dropped as soon as a lookup or store is made for
+# another version. Within a version the least recently used results are
+# evicted once their blobs take more than `RESULT_CACHE_BYTES`.
+local_results = {"version": None, "blobs": OrderedDict(), "bytes": 0}
+local_results_lock = threading.Lock()
+
+
+def reset_local_results(data_version):
+    """Drop the results of other data versions.
+
+    Must be called with `local_results_lock` held.
+    """
+    if local_results["version"] != data_version:
+        local_results["version"] = data_version
+        local_results["blobs"] = OrderedDict()
+        local_results["bytes"] = 0
+
+
+def get_local_result(data_version, key):
+    """Memoized blob of `key` for `data_version`, or None."""
+    with local_results_lock:
+        reset_local_results(data_version)
+        blob = local_results["blobs"].get(key)
+        if blob is not None:
+            local_results["blobs"].move_to_end(key)
+        return blob
+
+
+def store_local_result(data_version, key, blob):
+    """Memoize a blob, evicting the least recently used ones beyond the byte budget."""
+    with local_results_lock:
+        reset_local_results(data_version)
+        blobs = local_results["blobs"]
+        if key in blobs:
+            local_results["bytes"] -= len(blobs.pop(key))
+        # Results larger than the whole budget are not kept at all
+        if len(blob) > config.RESULT_CACHE_BYTES:
+            return
+        blobs[key] = blob
+        local_results["bytes"] += len(blob)
+        while local_results["bytes"] > config.RESULT_CACHE_BYTES:
+            _, evicted_blob = blobs.popitem(last=False)
+            local_results["bytes"] -= len(evicted_blob)
+
+
+def clear_local_results():
+    with local_results_lock:
+        reset_local_results(None)
@@ -0,0 +1,55 @@
+import random
+import threading
+
+import config
+from db_utils import get_refresh_stats, refresh_data
+
+
+def get_next_refresh_delay(consecutive_failures):
+    """Seconds until the next refresh, with jitter and backoff after failures."""
+    if consecutive_failures:
+        delay = min(
+            config.REFRESH_RETRY_SECONDS * 2 ** (consecutive_failures - 1),
+            config.REFRESH_INTERVAL_SECONDS,
+        )
+    else:
+        delay = config.REFRESH_INTERVAL_SECONDS
+    # Jitter keeps the schedulers of several processes from firing together
+    return delay + random.uniform(0, config.REFRESH_JITTER_SECONDS)
+
+
+def run_scheduler(stop_event=None):
+    """Refresh the cached data on a fixed interval until `stop_event` is set.
+
+    Failures, including an unreachable Redis, are retried with backoff, so
+    only `stop_event` ends the loop.
+    """
+    stop_event = stop_event or threading.Event()
+    consecutive_failures = 0
+
+    while not stop_event.is_set():
+        try:
+            refresh_data()
+            consecutive_failures = 0
+        except Exception as e:
+            consecutive_failures += 1
+            print(f"Scheduled refresh failed ({consecutive_failures} in a row): {e}")
+
+        # The stats live in Redis as well, so they may be unreachable too
+        try:
+            print(f"Refresh stats: {get_refresh_stats()}")
+        except Exception as e:
+            print(f"Could not read the refresh stats: {e}")
+        stop_event.wait(get_next_refresh_delay(consecutive_failures))
+
+
+def start_scheduler_thread():
+    thread = threading.Thread(
+        target=run_scheduler, name="refresh-scheduler", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    run_scheduler()
@@ -0,0 +1,61 @@
+import gzip
+import pickle
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+import config
+
+# Leading bytes used to detect the format of a cached blob
+ARROW_MAGIC = b"ARROW1"
+PARQUET_MAGIC = b"PAR1"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def serialize_frame(df, serializer=None):
+    """Serialize a DataFrame for Redis using the configured cache format.
+
+    - "arrow": Arrow IPC file (Feather v2) with per-column compression
+    - "parquet": Parquet file with per-column compression
+    - "pickle": gzip compressed pickle (legacy format)
+    """
+    serializer = serializer or config.CACHE_SERIALIZER
+
+    if serializer == "pickle":
+        return gzip.compress(pickle.dumps(df))
+
+    # Categoricals are kept as Arrow dictionary arrays
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if serializer == "arrow":
+        feather.write_feather(table, sink, compression=config.CACHE_COMPRESSION)
+    elif serializer == "parquet":
+        pq.write_table(table, sink, compression=config.CACHE_COMPRESSION)
+    else:
+        raise ValueError(f"Unknown cache serializer: {serializer}")
+    return sink.getvalue().to_pybytes()
+
+
+def deserialize_frame(blob, columns=None):
+    """Deserialize a cached DataFrame, decoding only the requested columns.
+
+    The format is detected from the blob itself, so values written with an
+    older serializer stay readable after `CACHE_SERIALIZER` is changed.
+    """
+    if blob.startswith(GZIP_MAGIC):
+        df = pickle.loads(gzip.decompress(blob))
+        return df[columns] if columns else df
+
+    source = pa.BufferReader(blob)
+    if blob.startswith(ARROW_MAGIC):
+        table = feather.read_table(source, columns=columns, memory_map=False)
+    elif blob.startswith(PARQUET_MAGIC):
+        table = pq.read_table(source, columns=columns)
+    else:
+        raise ValueError("Unknown cached frame format")
+
+    if columns:
+        # Keep the column order requested by the caller
+        table = table.select(columns)
+    return table.to_pandas()
@@ -0,0 +1,98 @@
+import numpy as np
+
+import config
+
+# HyperLogLog sketches of distinct learners.
+#
+# A sketch is a (learners, registers) pair, of which only one is set:
+# - learners: sorted unique 64-bit learner hashes, kept while the set is small
+# - registers: 2**precision HyperLogLog registers, one byte each
+# A set switches to registers once its hashes would take more bytes than them,
+# so small cardinalities are counted exactly.
+
+
+def get_exact_limit(precision):
+    return 2**precision // 8
+
+
+def standard_error(precision=None):
+    """Relative standard error of a HyperLogLog estimate."""
+    precision = precision or config.HLL_PRECISION
+    return 1.04 / np.sqrt(2**precision)
+
+
+def get_bit_lengths(values):
+    """Number of significant bits of every uint64 value."""
+    values = values.copy()
+    bit_lengths = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        has_high_bits = values >= np.uint64(1 << shift)
+        bit_lengths[has_high_bits] += shift
+        values[has_high_bits] >>= np.uint64(shift)
+    return bit_lengths + (values > 0)
+
+
+def build_registers(hashes, precision=None):
+    """HyperLogLog registers of 64-bit hashes."""
+    precision = precision or config.HLL_PRECISION
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    value_bits = 64 - precision
+
+    # The first bits pick the register, the position of the first set bit of
+    # the remaining ones is the value it keeps the maximum of
+    indexes = (hashes >> np.uint64(value_bits)).astype(np.intp)
+    values = hashes & np.uint64((1 << value_bits) - 1)
+    ranks = (value_bits - get_bit_lengths(values) + 1).astype(np.uint8)
+
+    registers = np.zeros(2**precision, dtype=np.uint8)
+    np.maximum.at(registers, indexes, ranks)
+    return registers
+
+
+def build_sketch(hashes, precision=None):
+    """Sketch of a set of unique 64-bit hashes."""
+    precision = precision or config.HLL_PRECISION
+    if len(hashes) <= get_exact_limit(precision):
+        return np.sort(np.asarray(hashes, dtype=np.uint64)), None
+    return None, build_registers(hashes, precision)
+
+
+def merge_sketches(sketches, precision=None):
+    """Sketch of the union of the sets of `sketches`."""
+    precision = precision or config.HLL_PRECISION
+    learner_sets, register_sets = [], []
+    for learners, registers in sketches:
+        if learners is not None:
+            learner_sets.append(learners)
+        else:
+            register_sets.append(registers)
+
+    learners = (
+        np.unique(np.concatenate(learner_sets))
+        if learner_sets
+        else np.array([], dtype=np.uint64)
+    )
+    if not register_sets:
+        return build_sketch(learners, precision)
+
+    register_sets.append(build_registers(learners, precision))
+    return None, np.maximum.reduce(register_sets)
+
+
+def estimate_distinct(sketch):
+    """Number of distinct learners of a sketch."""
+    learners, registers = sketch
+    if learners is not None:
+        return len(learners)
+
+    registers_count = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / registers_count)
+    estimate = (
+        alpha * registers_count**2 / np.sum(np.ldexp(1.0, -registers.astype(np.int32)))
+    )
+
+    # Small cardinalities are estimated from the empty registers instead
+    empty_registers = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * registers_count and empty_registers:
+        estimate = registers_count * np.log(registers_count / empty_registers)
+    return int(round(estimate))
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import dash
+
+# Make the app modules importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config reads these at import; the clients built from them only connect when used
+for name, value in [
+    ("DB_HOST", "localhost"),
+    ("DB_PORT", "5432"),
+    ("DB_USER", "postgres"),
+    ("DB_PASSWORD", "postgres"),
+    ("DB_NAME", "postgres"),
+    ("REDIS_HOST", "localhost"),
+    ("REDIS_PORT", "6379"),
+]:
+    os.environ.setdefault(name, value)
+
+# Pages register themselves with the Dash app on import, which requires an app
+# with pages enabled; the tests import page modules without one
+dash.register_page = lambda module, **kwargs: None
@@ -0,0 +1,118 @@
+"""Equivalence of the vectorized `apply_diff_or_copy` with the per-group version.
+
+The vectorized function mutates the frame it is given and returns it, so
+callers pass it a frame they own (the tests pass it a copy).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.digital_master_dashboard import apply_diff_or_copy
+
+
+def apply_diff_or_copy_per_group(group):
+    # Reference: the function previously applied to every learner-day group
+    if group["time_diff_clipped"].sum() > 2700:
+        group.loc[:, "time_diff_clipped"] = group["time_diff_clipped"].diff(1).abs()
+    else:
+        group.loc[:, "time_diff_clipped"] = group["time_diff_clipped"]
+    return group
+
+
+def make_jump_data(seed, learner_id_dtype, rows):
+    """Random learner-days sorted like `get_grade_jump_data` sorts them."""
+    rng = np.random.default_rng(seed)
+    learners = [f"learner-{i:03d}" for i in range(max(rows // 4, 1))]
+    min_time = pd.Timestamp("2024-05-01") + pd.to_timedelta(
+        rng.integers(0, 10 * 24 * 3600, rows), unit="s"
+    )
+    # Durations cluster around the 2700 s threshold and the 2700 s clip
+    time_diff = rng.choice(
+        [0.0, 1.0, 899.0, 900.0, 1349.0, 1350.0, 1351.0, 2699.0, 2700.0, 2701.0],
+        rows,
+    ) + np.where(rng.random(rows) < 0.3, rng.uniform(0, 4000, rows), 0.0)
+    data = pd.DataFrame(
+        {
+            "learner_id": pd.Series(
+                rng.choice(learners, rows), dtype=learner_id_dtype
+            ),
+            "date": min_time.normalize(),
+            "min_time": min_time,
+            "time_diff": time_diff,
+        }
+    )
+    data["time_diff_clipped"] = data["time_diff"].clip(upper=2700)
+    data.sort_values(
+        by=["learner_id", "date", "min_time"], ascending=[True, True, True], inplace=True
+    )
+    return data
+
+
+def assert_same_as_per_group(data):
+    expected = (
+        data.copy()
+        .groupby(["learner_id", "date"], observed=True)
+        .apply(apply_diff_or_copy_per_group)
+        .reset_index(drop=True)
+    )
+    actual = apply_diff_or_copy(data.copy()).reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize("learner_id_dtype", ["string", "category"])
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_per_group_version_on_random_data(seed, learner_id_dtype):
+    rows = [1, 2, 5, 40, 500][seed % 5]
+    assert_same_as_per_group(make_jump_data(seed, learner_id_dtype, rows))
+
+
+@pytest.mark.parametrize("learner_id_dtype", ["string", "category"])
+def test_single_row_learner_days(learner_id_dtype):
+    data = make_jump_data(0, learner_id_dtype, 30)
+    # Every row gets a learner-day of its own
+    data["learner_id"] = pd.Series(
+        [f"learner-{i:03d}" for i in range(len(data))],
+        index=data.index,
+        dtype=learner_id_dtype,
+    )
+    data.sort_values(by=["learner_id", "date", "min_time"], inplace=True)
+    assert_same_as_per_group(data)
+
+
+@pytest.mark.parametrize("learner_id_dtype", ["string", "category"])
+@pytest.mark.parametrize(
+    "time_diffs",
+    [
+        [2700.0],
+        [1350.0, 1350.0],
+        [1349.0, 1350.0],
+        [1350.0, 1351.0],
+        [900.0, 900.0, 900.0],
+        [900.0, 900.0, 901.0],
+        [2700.0, 0.0],
+        [2700.0, 1.0],
+    ],
+)
+def test_learner_days_around_threshold(time_diffs, learner_id_dtype):
+    # One learner-day summing to exactly, just below or just above 2700 s,
+    # next to a learner-day that stays below it
+    rows = len(time_diffs)
+    data = pd.DataFrame(
+        {
+            "learner_id": pd.Series(
+                ["learner-a"] * rows + ["learner-b"], dtype=learner_id_dtype
+            ),
+            "date": pd.Timestamp("2024-05-01"),
+            "min_time": pd.Timestamp("2024-05-01 08:00")
+            + pd.to_timedelta(np.arange(rows + 1), unit="h"),
+            "time_diff": time_diffs + [600.0],
+        }
+    )
+    data["time_diff_clipped"] = data["time_diff"].clip(upper=2700)
+    assert_same_as_per_group(data)
+
+
+def test_mutates_and_returns_its_input():
+    data = make_jump_data(1, "string", 40)
+    assert apply_diff_or_copy(data) is data
@@ -0,0 +1,224 @@
+import gzip
+import pickle
+
+import pandas as pd
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import db_utils
+
+# dtypes of the rows `get_learners_data` returns
+RAW_LEARNERS_DATA_DTYPES = {
+    "tenant_name": "category",
+    "school": "category",
+    "grade": "category",
+    "learner_name": "category",
+    "learner_username": "category",
+    "learner_id": "string",
+    "question_id": "string",
+    "question_set_id": "string",
+    "updated_at": "datetime64[ns]",
+    "attempts_count": "int8",
+    "score": "int8",
+    "qset_grade_identifier": "string",
+    "operation_identifier": "string",
+    "qset_name": "category",
+    "qset_uid": "string",
+    "purpose": "category",
+    "repo_name_identifier": "string",
+    "l1_skill_identifier": "string",
+    "l2_skill_identifier": "string",
+    "l3_skill_identifier": "string",
+    "sequence": "int16",
+    "status": "category",
+}
+
+
+def make_raw_learners_data(rows):
+    """Rows as `get_learners_data` returns them, from (learner, qset, question, time)."""
+    return pd.DataFrame(
+        {
+            "tenant_name": ["Tenant A"] * len(rows),
+            "school": ["School A"] * len(rows),
+            "grade": ["3"] * len(rows),
+            "learner_name": [learner_id for learner_id, _, _, _ in rows],
+            "learner_username": [learner_id for learner_id, _, _, _ in rows],
+            "learner_id": [learner_id for learner_id, _, _, _ in rows],
+            "question_id": [question_id for _, _, question_id, _ in rows],
+            "question_set_id": [question_set_id for _, question_set_id, _, _ in rows],
+            "updated_at": pd.to_datetime([updated_at for _, _, _, updated_at in rows]),
+            "attempts_count": [1] * len(rows),
+            "score": [1] * len(rows),
+            "qset_grade_identifier": ["grade-3"] * len(rows),
+            "operation_identifier": ["addition"] * len(rows),
+            "qset_name": ["Addition 1"] * len(rows),
+            "qset_uid": ["qset-uid"] * len(rows),
+            "purpose": ["Practice"] * len(rows),
+            "repo_name_identifier": ["repository"] * len(rows),
+            "l1_skill_identifier": ["addition"] * len(rows),
+            "l2_skill_identifier": ["addition-l2"] * len(rows),
+            "l3_skill_identifier": ["addition-l3"] * len(rows),
+            "sequence": [1] * len(rows),
+            "status": ["completed"] * len(rows),
+        }
+    ).astype(RAW_LEARNERS_DATA_DTYPES)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(db_utils, "redis_client", client)
+    monkeypatch.setattr(
+        db_utils,
+        "local_learners_data",
+        {"version": None, "manifest": None, "frames": {}, "partitions": {}},
+    )
+    monkeypatch.setattr(db_utils, "local_derived_data", {})
+    # Reference data is cached as-is, the database is never queried
+    monkeypatch.setattr(db_utils, "update_cache", lambda fencing_token=None: [])
+
+    reference_data = {
+        db_utils.ALL_GRADES_KEY: pd.DataFrame(
+            {"identifier": ["grade-3"], "id": [3], "grade": ["Class 3"]}
+        ),
+        db_utils.ALL_SKILLS_KEY: pd.DataFrame(
+            {
+                "identifier": ["addition", "addition-l2", "addition-l3"],
+                "skill": ["Addition", "Addition L2", "Addition L3"],
+                "type": ["l1_skill", "l2_skill", "l3_skill"],
+            }
+        ),
+        db_utils.ALL_REPOSITORY_NAMES_KEY: pd.DataFrame(
+            {"identifier": ["repository"], "repo_name": ["Repository"]}
+        ),
+        db_utils.LAST_QUESTION_PER_QSET_GRADE_KEY: pd.DataFrame(
+            {
+                "operation": ["Addition"],
+                "qset_grade": ["class-three"],
+                "question_set_id": ["qset-1"],
+                "question_id": ["question-2"],
+            }
+        ).astype({"operation": "category", "qset_grade": "category"}),
+    }
+    for key, frame in reference_data.items():
+        client.set(key, pickle.dumps(frame))
+    return client
+
+
+def get_cached_learners_data(redis_client):
+    learners_data = db_utils.get_local_learners_data(
+        redis_client.get(db_utils.LEARNERS_DATA_VERSION_KEY)
+    )
+    return learners_data.assign(
+        **{
+            column: db_utils.decode_ids(
+                db_utils.get_id_dictionary(column), learners_data[column]
+            )
+            for column in ["learner_id", "question_id"]
+        }
+    ).sort_values(["learner_id", "question_id"], ignore_index=True)
+
+
+def test_refresh_upgrades_a_baseline_learners_data_blob(redis_client, monkeypatch):
+    cached_rows = [
+        ("learner-1", "qset-1", "question-1", "2024-05-06 10:00"),
+        ("learner-1", "qset-1", "question-2", "2024-05-06 10:05"),
+        ("learner-2", "qset-1", "question-1", "2024-04-29 09:00"),
+    ]
+    # The baseline cached the processed frame as a single gzipped pickle,
+    # without the columns precomputed at ingest since
+    baseline_learners_data = db_utils.process_learners_data(
+        make_raw_learners_data(cached_rows)
+    ).drop(columns=db_utils.LEARNERS_DATA_DERIVED_COLUMNS)
+    redis_client.set(
+        db_utils.ALL_LEARNER_DATA_KEY,
+        gzip.compress(pickle.dumps(baseline_learners_data)),
+    )
+
+    refreshed_rows = [
+        # No new rows, then an updated and a new row, then the boundary row again
+        [],
+        [
+            ("learner-2", "qset-1", "question-1", "2024-05-07 09:00"),
+            ("learner-2", "qset-1", "question-2", "2024-05-07 09:05"),
+        ],
+        [("learner-2", "qset-1", "question-2", "2024-05-07 09:05")],
+    ]
+    monkeypatch.setattr(
+        db_utils,
+        "get_learners_data",
+        lambda last_updated_at=None: make_raw_learners_data(refreshed_rows.pop(0)),
+    )
+
+    for _ in range(3):
+        db_utils.fetch_all_data()
+
+    assert not redis_client.exists(db_utils.ALL_LEARNER_DATA_KEY)
+    manifest = db_utils.get_learners_data_manifest()
+    assert all(
+        db_utils.is_current_learners_data_partition(partition)
+        for partition in manifest.values()
+    )
+    assert all(redis_client.exists(key) for key in db_utils.DERIVED_LEARNERS_DATA_KEYS)
+
+    learners_data = get_cached_learners_data(redis_client)
+    assert learners_data[["learner_id", "question_id"]].values.tolist() == [
+        ["learner-1", "question-1"],
+        ["learner-1", "question-2"],
+        ["learner-2", "question-1"],
+        ["learner-2", "question-2"],
+    ]
+    assert learners_data["updated_at"].tolist() == list(
+        pd.to_datetime(
+            [
+                "2024-05-06 10:00",
+                "2024-05-06 10:05",
+                "2024-05-07 09:00",
+                "2024-05-07 09:05",
+            ]
+        )
+    )
+    assert learners_data["week_range"].astype(str).tolist() == [
+        "2024-05-06,2024-05-12"
+    ] * 4
+    assert learners_data["is_last_question"].tolist() == [False, True, False, True]
+
+
+def test_refresh_after_an_empty_first_load(redis_client, monkeypatch):
+    # Earlier versions cached an empty manifest when the first load was empty
+    redis_client.set(db_utils.LEARNERS_DATA_MANIFEST_KEY, "{}")
+    redis_client.set(db_utils.LEARNERS_DATA_VERSION_KEY, 1)
+
+    refreshed_rows = [
+        [],
+        [],
+        [
+            ("learner-1", "qset-1", "question-1", "2024-05-06 10:00"),
+            ("learner-1", "qset-1", "question-2", "2024-05-06 10:05"),
+        ],
+    ]
+    monkeypatch.setattr(
+        db_utils,
+        "get_learners_data",
+        lambda last_updated_at=None: make_raw_learners_data(refreshed_rows.pop(0)),
+    )
+
+    for _ in range(2):
+        db_utils.fetch_all_data()
+        learners_data = get_cached_learners_data(redis_client)
+        assert learners_data.empty
+        assert {"learner_id", "updated_at", "week_range", "is_last_question"} <= set(
+            learners_data.columns
+        )
+        assert all(
+            redis_client.exists(key) for key in db_utils.DERIVED_LEARNERS_DATA_KEYS
+        )
+
+    db_utils.fetch_all_data()
+    learners_data = get_cached_learners_data(redis_client)
+    assert learners_data[["learner_id", "question_id"]].values.tolist() == [
+        ["learner-1", "question-1"],
+        ["learner-1", "question-2"],
+    ]
+    assert learners_data["is_last_question"].tolist() == [False, True]
@@ -0,0 +1,59 @@
+import threading
+
+import redis
+
+import config
+import scheduler
+
+
+def test_scheduler_survives_failing_redis_calls(monkeypatch):
+    stop_event = threading.Event()
+    refreshes = []
+
+    def refresh_data():
+        refreshes.append(len(refreshes))
+        if len(refreshes) == 5:
+            stop_event.set()
+        raise redis.exceptions.ConnectionError("Redis is unreachable")
+
+    def get_refresh_stats():
+        raise redis.exceptions.ConnectionError("Redis is unreachable")
+
+    monkeypatch.setattr(scheduler, "refresh_data", refresh_data)
+    monkeypatch.setattr(scheduler, "get_refresh_stats", get_refresh_stats)
+    monkeypatch.setattr(config, "REFRESH_RETRY_SECONDS", 0)
+    monkeypatch.setattr(config, "REFRESH_JITTER_SECONDS", 0)
+
+    thread = threading.Thread(target=scheduler.run_scheduler, args=(stop_event,))
+    thread.start()
+    thread.join(timeout=10)
+
+    # The loop kept retrying through the failures and only the stop event ended it
+    assert not thread.is_alive()
+    assert len(refreshes) == 5
+
+
+def test_scheduler_recovers_once_redis_is_back(monkeypatch):
+    stop_event = threading.Event()
+    stats_calls = []
+
+    def refresh_data():
+        if len(stats_calls) < 2:
+            raise redis.exceptions.ConnectionError("Redis is unreachable")
+
+    def get_refresh_stats():
+        stats_calls.append(len(stats_calls))
+        if len(stats_calls) < 2:
+            raise redis.exceptions.ConnectionError("Redis is unreachable")
+        stop_event.set()
+        return {"refreshes": 1}
+
+    monkeypatch.setattr(scheduler, "refresh_data", refresh_data)
+    monkeypatch.setattr(scheduler, "get_refresh_stats", get_refresh_stats)
+    monkeypatch.setattr(config, "REFRESH_RETRY_SECONDS", 0)
+    monkeypatch.setattr(config, "REFRESH_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(config, "REFRESH_JITTER_SECONDS", 0)
+
+    scheduler.run_scheduler(stop_event)
+
+    assert len(stats_calls) == 2